@@ -4,45 +4,96 @@ Custom integration to integrate integration_blueprint with Home Assistant.
 For more details about this integration, please refer to
 https://github.com/custom-components/integration_blueprint
 """
+
 import asyncio
+from contextlib import aclosing
 from datetime import timedelta
 import hashlib
-import json
 import logging
-from urllib.parse import parse_qs
+import os
+import time
 
+from aiohttp import ClientError, web
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import Config, HomeAssistant
+from homeassistant.core import Config, HomeAssistant, callback
 from homeassistant.exceptions import ConfigEntryNotReady
-from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers import device_registry as dr
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.helpers.storage import Store
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
 import traceback
-from custom_components.integration_ttlock.ttlock import extract_lock_status_from_records
+from custom_components.integration_ttlock.ttlock import (
+    changed_fields,
+    extract_lock_status_from_records_with_lock_id,
+    filter_records_after,
+    group_records_by_lock_id,
+    has_gateway,
+    is_state_record,
+    newest_record,
+    project_record,
+    record_position,
+)
 
 
-from .ttlock_api import TTLockApiClient
+from .client_registry import async_get_client_registry
+from .commands import TTLockCommands
+from .events import TTLockRecordEvents
+from .history import TTLockHistory
+from .rate_limiter import TTLockRateLimiter
+from .scheduler import TTLockPollScheduler
+from .services import async_setup_services
+from .state_store import TTLockStateStore
+from .ttlock_api import TTLockApiClient, TTLockCircuitOpenError, TTLockError
 from .validators import validate_lock_data
+from .webhook import TTLockWebhookQueue
 
 from .const import (
+    ACCOUNT_RECORDS_LIMIT,
+    ACCOUNT_RECORDS_SKEW_MARGIN,
+    CONF_ACCESS_TOKEN,
+    CONF_ACCESS_TOKEN_EXPIRES_AT,
     CONF_CLIENT_ID,
     CONF_CLIENT_SECRET,
+    CONF_HISTORY_RETENTION_DAYS,
+    CONF_MAX_CONCURRENCY,
+    CONF_MAX_SCAN_INTERVAL,
+    CONF_MIN_SCAN_INTERVAL,
+    CONF_RATE_BURST,
+    CONF_RATE_LIMIT,
     CONF_REFRESH_TOKEN,
+    CONF_REFRESH_TYPE,
     CONF_SERVER,
     CONF_USERNAME,
+    DEFAULT_HISTORY_RETENTION_DAYS,
+    DEFAULT_MAX_CONCURRENCY,
+    DEFAULT_MAX_SCAN_INTERVAL,
+    DEFAULT_MIN_SCAN_INTERVAL,
+    DEFAULT_RATE_BURST,
+    DEFAULT_RATE_LIMIT,
     DOMAIN,
+    GATEWAYS_REFRESH_INTERVAL,
+    LOCKS_REFRESH_INTERVAL,
     PLATFORMS,
+    RECORD_MARKS_SAVE_DELAY,
+    RECORDS_INITIAL_LIMIT,
+    REFRESH_POLLING,
+    REFRESH_POLLING_ACCOUNT_LOGS,
+    REFRESH_POLLING_LOGS,
+    REFRESH_WEBHOOK_LOGS,
+    SNAPSHOT_SAVE_DELAY,
     STARTUP_MESSAGE,
+    STORAGE_VERSION,
 )
 
-SCAN_INTERVAL = timedelta(seconds=30)
 DEPENDENCIES = ["webhook"]
+HISTORY_PRUNE_INTERVAL = timedelta(hours=12)
 
 _LOGGER: logging.Logger = logging.getLogger(__package__)
 
 
-async def async_setup(hass: HomeAssistant, entry: ConfigEntry):
-    """Set up this integration using YAML is not supported."""
-    del hass, entry
+async def async_setup(hass: HomeAssistant, config: Config):
+    """Set up integration services, configuration using YAML is not supported."""
+    async_setup_services(hass)
     return True
 
 
@@ -58,28 +109,66 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
     username = entry.data.get(CONF_USERNAME)
     refresh_token = entry.data.get(CONF_REFRESH_TOKEN)
 
-    session = async_get_clientsession(hass)
-    client = TTLockApiClient(url, client_id, client_secret, username, session)
+    rate_limiter = TTLockRateLimiter(
+        float(entry.options.get(CONF_RATE_LIMIT, DEFAULT_RATE_LIMIT)),
+        int(entry.options.get(CONF_RATE_BURST, DEFAULT_RATE_BURST)),
+    )
+    # Entries of the same account share a client and its tokens
+    registry = async_get_client_registry(hass)
+    client = registry.async_get_client(
+        url, client_id, client_secret, username, rate_limiter
+    )
+    entry.async_on_unload(lambda: registry.async_release_client(client))
 
-    def on_token_refresh(new_token: str):
+    def on_new_token(access_token: str, expires_at: float, new_refresh_token: str):
         entry_data = entry.data.copy()
-        entry_data[CONF_REFRESH_TOKEN] = new_token
+        entry_data[CONF_ACCESS_TOKEN] = access_token
+        entry_data[CONF_ACCESS_TOKEN_EXPIRES_AT] = expires_at
+        entry_data[CONF_REFRESH_TOKEN] = new_refresh_token
         hass.config_entries.async_update_entry(entry, data=entry_data)
 
-    client.on_new_refresh_token(on_token_refresh)
-    data = await client.async_authenticate(refresh_token, "refresh_token")
-    if "access_token" not in data:
-        raise ConfigEntryNotReady("Invalid credentials")
+    if client.tokens[2] is None:
+        client.set_tokens(
+            entry.data.get(CONF_ACCESS_TOKEN),
+            entry.data.get(CONF_ACCESS_TOKEN_EXPIRES_AT),
+            refresh_token,
+        )
+    elif client.tokens[2] != refresh_token:
+        # Refresh tokens are single use, keep the one of the shared client
+        on_new_token(*client.tokens)
+
+    entry.async_on_unload(client.on_new_token(on_new_token))
 
-    coordinator = TTLockDataUpdateCoordinator(hass, client=client)
-    await coordinator.async_config_entry_first_refresh()
+    coordinator = TTLockDataUpdateCoordinator(hass, client=client, entry=entry)
+    await coordinator.async_load_record_marks()
+    await coordinator.history.async_setup()
+    # Unload callbacks also run when setup fails and is retried
+    entry.async_on_unload(coordinator.history.async_close)
+
+    async def async_prune_history(now):
+        await coordinator.history.async_prune()
+
+    entry.async_on_unload(
+        async_track_time_interval(hass, async_prune_history, HISTORY_PRUNE_INTERVAL)
+    )
+
+    # Start from last known locks, access token is refreshed on first request
+    from_snapshot = await coordinator.async_load_snapshot()
+    if not from_snapshot:
+        if not await client.async_ensure_access_token():
+            raise ConfigEntryNotReady("Invalid credentials")
+
+        await coordinator.async_config_entry_first_refresh()
 
     hass.data[DOMAIN][entry.entry_id] = coordinator
 
-    if entry.options.get("refresh_type") == "Webhook Logs":
+    if entry.options.get(CONF_REFRESH_TYPE) == REFRESH_WEBHOOK_LOGS:
         webhook_id = entry.options.get(
             "webhook_id", hashlib.md5((client_id + client_secret).encode()).hexdigest()
         )
+        coordinator.webhook_id = webhook_id
+        coordinator.webhook_queue = TTLockWebhookQueue(hass, coordinator)
+        coordinator.webhook_queue.start()
 
         hass.components.webhook.async_register(
             DOMAIN,
@@ -94,12 +183,27 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
         _LOGGER.debug("webhook data: %s", url)
         print("Webhook data %s" % url)
 
-    for platform in PLATFORMS:
-        coordinator.platforms.append(platform)
-        hass.async_add_job(
-            hass.config_entries.async_forward_entry_setup(entry, platform)
+    coordinator.platforms.extend(PLATFORMS)
+    await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+
+    if from_snapshot:
+
+        async def async_revalidate():
+            if await coordinator.async_revalidate():
+                # Entities are only created on setup
+                async_remove_missing_locks(hass, entry, coordinator.data["locks"])
+                hass.config_entries.async_schedule_reload(entry.entry_id)
+
+        entry.async_create_background_task(
+            hass, async_revalidate(), "integration_ttlock revalidate"
         )
+    else:
+        async_remove_missing_locks(hass, entry, coordinator.data["locks"])
 
+    # Pruning a large history must not delay startup
+    entry.async_create_background_task(
+        hass, coordinator.history.async_prune(), "integration_ttlock prune history"
+    )
     entry.async_on_unload(entry.add_update_listener(async_reload_entry))
     return True
 
@@ -107,28 +211,463 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
 class TTLockDataUpdateCoordinator(DataUpdateCoordinator):
     """Class to manage fetching data from the API."""
 
-    def __init__(self, hass: HomeAssistant, client: TTLockApiClient) -> None:
+    def __init__(
+        self, hass: HomeAssistant, client: TTLockApiClient, entry: ConfigEntry
+    ) -> None:
         """Initialize."""
         self.api = client
         self.platforms = []
+        self.options = dict(entry.options)
+        self.refresh_type = entry.options.get(CONF_REFRESH_TYPE, REFRESH_POLLING)
+        self.max_concurrency = int(
+            entry.options.get(CONF_MAX_CONCURRENCY, DEFAULT_MAX_CONCURRENCY)
+        )
+        self.poll_scheduler = TTLockPollScheduler(
+            int(entry.options.get(CONF_MIN_SCAN_INTERVAL, DEFAULT_MIN_SCAN_INTERVAL)),
+            int(entry.options.get(CONF_MAX_SCAN_INTERVAL, DEFAULT_MAX_SCAN_INTERVAL)),
+        )
+        self._locks_updated_at = None
+        self._gateways = {}
+        self._gateways_updated_at = None
+        self._gateway_flags = None
+        self.changed_fields = {}
+        self.stale = False
+        self.state_store = TTLockStateStore()
+        self.webhook_id = None
+        self.webhook_queue = None
+        self.entity_writes_performed = 0
+        self.entity_writes_skipped = 0
+        self.history = TTLockHistory(
+            hass,
+            history_path(hass, entry),
+            int(
+                entry.options.get(
+                    CONF_HISTORY_RETENTION_DAYS, DEFAULT_HISTORY_RETENTION_DAYS
+                )
+            ),
+        )
+        self.commands = TTLockCommands(hass, self)
+        self.record_events = TTLockRecordEvents(hass, self)
+        self._new_records = []
+        self._record_marks = {}
+        self._record_marks_store = Store(
+            hass, STORAGE_VERSION, f"{DOMAIN}.{entry.entry_id}.records"
+        )
+        self._snapshot_store = Store(
+            hass, STORAGE_VERSION, f"{DOMAIN}.{entry.entry_id}.snapshot"
+        )
 
-        super().__init__(hass, _LOGGER, name=DOMAIN, update_interval=SCAN_INTERVAL)
+        super().__init__(
+            hass,
+            _LOGGER,
+            name=DOMAIN,
+            update_interval=timedelta(seconds=self.poll_scheduler.min_interval),
+        )
+
+    def gateway_for(self, lock_id):
+        """Return key of the gateway relaying commands to a lock."""
+        if lock_id in self._gateways:
+            return ("gateway", self._gateways[lock_id])
+        # Gateway is not known, lock is reached on its own
+        return ("lock", lock_id)
+
+    async def async_load_record_marks(self) -> None:
+        """Load newest seen record of every lock from storage."""
+        stored = await self._record_marks_store.async_load()
+        if stored:
+            # JSON object keys are always strings
+            self._record_marks = {int(key): mark for key, mark in stored.items()}
+
+    async def async_load_snapshot(self) -> bool:
+        """Use last known locks and states as stale data until next refresh."""
+        snapshot = await self._snapshot_store.async_load()
+        if not snapshot:
+            return False
+
+        # JSON object keys are always strings
+        self.state_store.replace(
+            {int(key): state for key, state in snapshot["states"].items()}
+        )
+        self.data = {
+            "locks": {int(key): lock for key, lock in snapshot["locks"].items()},
+            "states": self.state_store.states,
+        }
+        self.stale = True
+        return True
+
+    async def async_revalidate(self) -> bool:
+        """Refresh snapshot data, return true when locks were added or removed."""
+        snapshot_lock_ids = set(self.data["locks"])
+        await self.async_refresh()
+        if not self.last_update_success or set(self.data["locks"]) == snapshot_lock_ids:
+            return False
+
+        # Setup after reload has to start from the current locks
+        await self._snapshot_store.async_save(self._snapshot())
+        return True
+
+    def _snapshot(self) -> dict:
+        """Return data to persist as snapshot."""
+        return {"locks": self.data["locks"], "states": self.state_store.states}
 
     async def _async_update_data(self):
         """Update data via library."""
+        # Nothing changed unless the update succeeds
+        self.changed_fields = {}
+        versions = self.state_store.versions()
         try:
-            locks = await self.api.list_lock()
+            locks = await self._async_update_locks()
 
-            locks = filter(validate_lock_data, locks)
-
-            return {
-                "locks": {data["lockId"]: data for data in locks},
-                "states": {},
+            data = {
+                "locks": locks,
+                "states": await self._async_update_states(locks),
             }
+
+            new_records, self._new_records = self._new_records, []
+            await self.history.async_add_records(new_records)
         except Exception as exception:
             traceback.print_exc()
             raise UpdateFailed() from exception
 
+        # States pushed while the refresh was running are newer than fetched ones
+        for lock_id in data["locks"]:
+            if (
+                self.state_store.version(lock_id) != versions.get(lock_id, 0)
+                and lock_id in self.state_store.states
+            ):
+                data["states"][lock_id] = self.state_store.states[lock_id]
+
+        self.record_events.async_forget(data["locks"])
+        self.changed_fields = self._diff_data(self.data, data)
+        if self.stale:
+            self.stale = False
+            for lock_id in data["locks"]:
+                self.changed_fields.setdefault(lock_id, set()).add("stale")
+
+        self.state_store.replace(data["states"])
+        data["states"] = self.state_store.states
+        self._snapshot_store.async_delay_save(self._snapshot, SNAPSHOT_SAVE_DELAY)
+        return data
+
+    @callback
+    def async_push_records(self, records: list) -> None:
+        """Apply pushed records newer than the record mark of their lock."""
+        states = {}
+        for lock_id, lock_records in group_records_by_lock_id(records).items():
+            # Retried or delayed callbacks repeat records that are already applied
+            new_records = filter_records_after(
+                lock_records, self._record_marks.get(lock_id)
+            )
+            if not new_records:
+                continue
+
+            new_records.sort(key=record_position, reverse=True)
+            state = self._apply_lock_records(lock_id, new_records, fire=True)
+            if any(is_state_record(rec) for rec in new_records):
+                states[lock_id] = state
+
+        if states:
+            self.async_push_states(states)
+
+    @callback
+    def async_push_states(self, states: dict) -> None:
+        """Apply pushed lock states, waking only entities of changed locks."""
+        for lock_id, state in states.items():
+            self.state_store.async_set(lock_id, state)
+        self._snapshot_store.async_delay_save(self._snapshot, SNAPSHOT_SAVE_DELAY)
+
+    @staticmethod
+    def _diff_data(old: dict, new: dict) -> dict:
+        """Return changed lock and state fields of every changed lock."""
+        if old is None:
+            old = {"locks": {}, "states": {}}
+
+        changes = {}
+        for lock_id, lock_data in new["locks"].items():
+            fields = changed_fields(old["locks"].get(lock_id), lock_data)
+            fields |= changed_fields(
+                old["states"].get(lock_id, {}), new["states"].get(lock_id, {})
+            )
+            if fields:
+                changes[lock_id] = fields
+
+        return changes
+
+    async def _async_update_locks(self) -> dict:
+        """Fetch lock list when it is older than the lock list refresh interval."""
+        now = time.monotonic()
+        if (
+            self._locks_updated_at is not None
+            and now - self._locks_updated_at < LOCKS_REFRESH_INTERVAL
+        ):
+            return self.data["locks"]
+
+        locks = await self.api.list_lock()
+        self._locks_updated_at = now
+
+        locks = {data["lockId"]: data for data in filter(validate_lock_data, locks)}
+        await self._async_update_gateways(locks)
+        return locks
+
+    async def _async_update_gateways(self, locks: dict) -> None:
+        """Map every lock to the gateway relaying commands to it."""
+        # Gateways rarely change, refresh them when the locks behind them do
+        now = time.monotonic()
+        gateway_flags = {lock_id: has_gateway(lock) for lock_id, lock in locks.items()}
+        if (
+            gateway_flags == self._gateway_flags
+            and now - self._gateways_updated_at < GATEWAYS_REFRESH_INTERVAL
+        ):
+            return
+
+        if not any(gateway_flags.values()):
+            self._gateways = {}
+            self._gateway_flags = gateway_flags
+            self._gateways_updated_at = now
+            return
+
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def limited_list_gateway_locks(gateway_id):
+            async with semaphore:
+                return await self.api.list_gateway_locks(gateway_id)
+
+        try:
+            gateway_ids = [
+                gateway["gatewayId"] async for gateway in self.api.iter_gateways()
+            ]
+            gateway_locks = await asyncio.gather(
+                *[limited_list_gateway_locks(gateway_id) for gateway_id in gateway_ids]
+            )
+        except (
+            asyncio.TimeoutError,
+            ClientError,
+            TTLockCircuitOpenError,
+            TTLockError,
+        ) as exception:
+            # Keep previous gateways, unknown ones only lose request pacing
+            _LOGGER.warning("Failed to update gateways: %s", exception)
+            return
+
+        gateways = {}
+        for gateway_id, lock_list in zip(gateway_ids, gateway_locks):
+            for lock in lock_list:
+                # Lock in range of several gateways, the first one relays
+                gateways.setdefault(lock["lockId"], gateway_id)
+        self._gateways = gateways
+        self._gateway_flags = gateway_flags
+        self._gateways_updated_at = now
+
+    async def _async_update_states(self, locks: dict) -> dict:
+        """Fetch lock states for all locks according to refresh type."""
+        lock_ids = list(locks)
+        states = dict(self.state_store.states)
+
+        if self.refresh_type == REFRESH_POLLING:
+            await self._async_fetch_states(
+                lock_ids,
+                lambda lock_id: self._async_fetch_polled_state(locks[lock_id]),
+                states,
+                per_gateway=True,
+            )
+        elif self.refresh_type == REFRESH_POLLING_LOGS:
+            await self._async_fetch_states(
+                lock_ids, self._async_fetch_record_state, states
+            )
+        elif self.refresh_type == REFRESH_POLLING_ACCOUNT_LOGS and any(
+            self.poll_scheduler.is_due(lock_id) for lock_id in lock_ids
+        ):
+            await self._async_fetch_account_record_states(lock_ids, states)
+
+        # Drop states of locks that are no longer present
+        return {lock_id: states[lock_id] for lock_id in lock_ids if lock_id in states}
+
+    async def _async_fetch_states(
+        self, lock_ids: list, fetch, states: dict, per_gateway: bool = False
+    ) -> None:
+        """Run fetch for every due lock with limited concurrency, collect states."""
+        lock_ids = self.poll_scheduler.due_locks(lock_ids)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        results = {}
+
+        # Gateways relay queries to their locks one at a time
+        lanes = {}
+        for lock_id in lock_ids:
+            lane = self.gateway_for(lock_id) if per_gateway else lock_id
+            lanes.setdefault(lane, []).append(lock_id)
+
+        async def run_lane(lane_lock_ids: list) -> None:
+            for lock_id in lane_lock_ids:
+                async with semaphore:
+                    try:
+                        results[lock_id] = await fetch(lock_id)
+                    except Exception as exception:  # pylint: disable=broad-except
+                        results[lock_id] = exception
+
+        await asyncio.gather(
+            *[run_lane(lane_lock_ids) for lane_lock_ids in lanes.values()]
+        )
+
+        for lock_id in lock_ids:
+            result = results[lock_id]
+            if isinstance(result, Exception):
+                # Keep last known state of this lock
+                _LOGGER.warning(
+                    "Failed to update state of lock %s: %s", lock_id, result
+                )
+                self.poll_scheduler.record_poll(lock_id, False)
+            else:
+                self._set_polled_state(lock_id, result, states)
+
+    def _set_polled_state(self, lock_id, state: dict, states: dict) -> None:
+        """Store polled lock state and adapt poll interval to lock activity."""
+        changed = state is not None and state != states.get(lock_id)
+        self.poll_scheduler.record_poll(lock_id, changed)
+        if state is not None:
+            states[lock_id] = state
+
+    async def _async_fetch_polled_state(self, lock: dict) -> dict:
+        """Fetch lock state with open state query when the lock can answer it."""
+        if not has_gateway(lock):
+            # Only records uploaded by the app tell the state of this lock
+            return await self._async_fetch_record_state(lock["lockId"])
+
+        return await self._async_fetch_open_state(lock["lockId"])
+
+    async def _async_fetch_open_state(self, lock_id) -> dict:
+        """Fetch lock state with open state query."""
+        response = await self.api.query_open_state(lock_id)
+
+        if "state" not in response:
+            return None
+
+        return {"state": int(response["state"]), "state_changed_by": None}
+
+    async def _async_fetch_record_state(self, lock_id) -> dict:
+        """Fetch lock state from lock records newer than the last seen record."""
+        mark = self._record_marks.get(lock_id)
+        since = mark["lockDate"] if mark else None
+        if mark is None:
+            # Backfill, records are newest first so stop at the first state change
+            records = await self._async_collect_records(
+                self.api.iter_lock_records(lock_id),
+                RECORDS_INITIAL_LIMIT,
+                stop=is_state_record,
+            )
+        else:
+            records = await self._async_collect_records(
+                self.api.iter_lock_records(lock_id, since)
+            )
+
+        return self._apply_lock_records(lock_id, records)
+
+    async def _async_fetch_account_record_states(
+        self, lock_ids: list, states: dict
+    ) -> None:
+        """Fetch records of all locks at once and resolve every lock state."""
+        newest = max(
+            (
+                self._record_marks[lock_id]["lockDate"]
+                for lock_id in lock_ids
+                if lock_id in self._record_marks
+            ),
+            default=None,
+        )
+        since = None
+        if newest is not None:
+            # Lock clocks differ, a margin before the newest seen record catches
+            # locks running behind without idle locks widening the window
+            now = int(time.time() * 1000)
+            since = min(newest, now) - ACCOUNT_RECORDS_SKEW_MARGIN * 1000
+        # Only the backfill is limited, marks must not skip unfetched records
+        limit = ACCOUNT_RECORDS_LIMIT if since is None else None
+        records = await self._async_collect_records(
+            self.api.iter_account_records(since), limit
+        )
+
+        records_by_lock_id = group_records_by_lock_id(records)
+
+        for lock_id in lock_ids:
+            state = self._apply_lock_records(
+                lock_id, records_by_lock_id.get(lock_id, [])
+            )
+            self._set_polled_state(lock_id, state, states)
+
+    @staticmethod
+    async def _async_collect_records(
+        records_iter, limit: int = None, stop=None
+    ) -> list:
+        """Collect streamed records until limit or a record matching stop."""
+        records = []
+        async with aclosing(records_iter) as records_iter:
+            async for record in records_iter:
+                records.append(record)
+                if limit is not None and len(records) >= limit:
+                    break
+                if stop is not None and stop(record):
+                    break
+
+        return records
+
+    def _apply_lock_records(self, lock_id, records: list, fire: bool = None) -> dict:
+        """Resolve lock state from records and advance the lock record mark."""
+        mark = self._record_marks.get(lock_id)
+        records = filter_records_after(records, mark)
+
+        if records:
+            # History rows are half the size with only fields the integration reads
+            records = [project_record(rec) for rec in records]
+            self._new_records.extend(records)
+            if fire is None:
+                # Backfilled records are past activity, not new events
+                fire = mark is not None
+            self.record_events.async_add(records, fire=fire)
+            (
+                lock_state,
+                lock_state_changed_by,
+            ) = extract_lock_status_from_records_with_lock_id(
+                lock_id, records, newest_first=True
+            )
+
+            if lock_state == 2 and mark is not None:
+                # No new record changes the lock state
+                lock_state = mark["state"]
+                lock_state_changed_by = mark["state_changed_by"]
+
+            newest = newest_record(records)
+            mark = {
+                "lockDate": newest["lockDate"],
+                "recordId": record_position(newest)[1],
+                "state": lock_state,
+                "state_changed_by": lock_state_changed_by,
+            }
+            self._record_marks[lock_id] = mark
+            self._record_marks_store.async_delay_save(
+                lambda: self._record_marks, RECORD_MARKS_SAVE_DELAY
+            )
+
+        if mark is None:
+            return None
+
+        return {"state": mark["state"], "state_changed_by": mark["state_changed_by"]}
+
+
+@callback
+def async_remove_missing_locks(
+    hass: HomeAssistant, entry: ConfigEntry, lock_ids
+) -> None:
+    """Remove devices and entities of locks no longer in the account."""
+    keep = {str(lock_id) for lock_id in lock_ids} | {entry.entry_id}
+    device_registry = dr.async_get(hass)
+    for device in dr.async_entries_for_config_entry(device_registry, entry.entry_id):
+        if not any(
+            domain == DOMAIN and str(identifier) in keep
+            for domain, identifier in device.identifiers
+        ):
+            device_registry.async_update_device(
+                device.id, remove_config_entry_id=entry.entry_id
+            )
+
 
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Handle removal of an entry."""
@@ -144,35 +683,45 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         )
     )
     if unloaded:
+        if coordinator.webhook_queue is not None:
+            hass.components.webhook.async_unregister(coordinator.webhook_id)
+            coordinator.webhook_queue.stop()
+        coordinator.commands.async_cancel()
         hass.data[DOMAIN].pop(entry.entry_id)
 
     return unloaded
 
 
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Remove local history of a removed entry."""
+    path = history_path(hass, entry)
+    if await hass.async_add_executor_job(os.path.exists, path):
+        await hass.async_add_executor_job(os.remove, path)
+
+
+def history_path(hass: HomeAssistant, entry: ConfigEntry) -> str:
+    """Return path of local lock record history database."""
+    return hass.config.path(f"{DOMAIN}_{entry.entry_id}.db")
+
+
 async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
     """Reload config entry."""
-    await async_unload_entry(hass, entry)
-    await async_setup_entry(hass, entry)
+    coordinator = hass.data[DOMAIN].get(entry.entry_id)
+    if coordinator is not None and coordinator.options == entry.options:
+        # Only stored tokens changed
+        return
+
+    await hass.config_entries.async_reload(entry.entry_id)
 
 
 async def handle_webhook(entry, hass, webhook_id, request):
     """Handle webhook callback."""
-    _LOGGER.info("webhook called")
-
-    body = await request.text()
-    data = parse_qs(body)
-    lockId = int(data["lockId"])
-
-    records_str = data["records"][0]
-    records = json.loads(records_str)
-
-    (
-        lock_state,
-        lock_state_changed_by,
-    ) = extract_lock_status_from_records(records)
+    _LOGGER.debug("webhook called")
 
+    # Acknowledge right away, records are applied by the queue worker
     coordinator = hass.data[DOMAIN][entry.entry_id]
-    coordinator.data[lockId]["state"] = lock_state
-    coordinator.data[lockId]["state_changed_by"] = lock_state_changed_by
+    if not coordinator.webhook_queue.enqueue(await request.text()):
+        # TTLock retries callbacks that are not acknowledged
+        return web.Response(status=503, text="busy")
 
-    return "success"
+    return web.Response(text="success")
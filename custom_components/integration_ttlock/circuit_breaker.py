@@ -0,0 +1,61 @@
+"""Circuit breaker for TTLock API servers."""
+import time
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+FAILURE_THRESHOLD = 5
+RECOVERY_TIMEOUT = 30
+
+_CIRCUIT_BREAKERS = {}
+
+
+class TTLockCircuitBreaker:
+    """Stops requests to a server that keeps failing"""
+
+    def __init__(
+        self,
+        failure_threshold: int = FAILURE_THRESHOLD,
+        recovery_timeout: float = RECOVERY_TIMEOUT,
+    ) -> None:
+        """Open after failure_threshold failures, probe after recovery_timeout."""
+        self._failure_threshold = failure_threshold
+        self._recovery_timeout = recovery_timeout
+        self._failures = 0
+        self._opened_at = None
+        self.state = STATE_CLOSED
+
+    def allow_request(self) -> bool:
+        """Return true when a request may be sent."""
+        if self.state == STATE_CLOSED:
+            return True
+
+        if time.monotonic() - self._opened_at >= self._recovery_timeout:
+            # Let a single request through to probe the server, another one
+            # only if the probe did not finish within recovery timeout
+            self.state = STATE_HALF_OPEN
+            self._opened_at = time.monotonic()
+            return True
+
+        return False
+
+    def record_success(self) -> None:
+        """Close the circuit after a successful request."""
+        self._failures = 0
+        self.state = STATE_CLOSED
+
+    def record_failure(self) -> None:
+        """Count a failed request and open the circuit when needed."""
+        self._failures += 1
+        if self.state == STATE_HALF_OPEN or self._failures >= self._failure_threshold:
+            self.state = STATE_OPEN
+            self._opened_at = time.monotonic()
+
+
+def get_circuit_breaker(server_url: str) -> TTLockCircuitBreaker:
+    """Return circuit breaker shared by all clients of a server."""
+    if server_url not in _CIRCUIT_BREAKERS:
+        _CIRCUIT_BREAKERS[server_url] = TTLockCircuitBreaker()
+
+    return _CIRCUIT_BREAKERS[server_url]
@@ -0,0 +1,121 @@
+"""Shared TTLock API clients and connection pool."""
+import logging
+
+import aiohttp
+from homeassistant.const import EVENT_HOMEASSISTANT_CLOSE
+from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.util.ssl import get_default_context
+
+from .const import DEFAULT_BULK_CONCURRENCY, DOMAIN_DATA
+from .rate_limiter import TTLockRateLimiter
+from .ttlock_api import TTLockApiClient
+
+# Default bulk commands must not queue behind the connection pool
+CONNECTION_LIMIT_PER_HOST = DEFAULT_BULK_CONCURRENCY
+DNS_CACHE_TTL = 300
+KEEPALIVE_TIMEOUT = 60
+
+_LOGGER: logging.Logger = logging.getLogger(__package__)
+
+
+class TTLockClientRegistry:
+    """Shares one API client per account and one connection pool for all"""
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize."""
+        self._hass = hass
+        self._session = None
+        self._cancel_close_listener = None
+        self._clients = {}
+        self._references = {}
+
+    @callback
+    def async_get_client(
+        self,
+        server_url: str,
+        client_id: str,
+        client_secret: str,
+        username: str,
+        rate_limiter: TTLockRateLimiter = None,
+    ) -> TTLockApiClient:
+        """Return client of an account, release it with async_release_client."""
+        key = (server_url, client_id, username)
+        if key not in self._clients:
+            # Rate limiter only applies to the client it creates
+            self._clients[key] = TTLockApiClient(
+                server_url,
+                client_id,
+                client_secret,
+                username,
+                self._async_get_session(),
+                rate_limiter,
+            )
+            self._references[key] = 0
+        elif rate_limiter is not None:
+            shared_limiter = self._clients[key].rate_limiter
+            if shared_limiter is None or shared_limiter.limits != rate_limiter.limits:
+                _LOGGER.warning(
+                    "Rate limit of %s is ignored, the client of this account is "
+                    "shared with another entry and keeps its own",
+                    username,
+                )
+
+        self._references[key] += 1
+        return self._clients[key]
+
+    async def async_release_client(self, client: TTLockApiClient) -> None:
+        """Release client, closing connections once no client is used."""
+        for key, shared_client in self._clients.items():
+            if shared_client is client:
+                break
+        else:
+            return
+
+        self._references[key] -= 1
+        if self._references[key] > 0:
+            return
+
+        del self._clients[key]
+        del self._references[key]
+        if not self._clients:
+            await self._async_close_session()
+
+    @callback
+    def _async_get_session(self) -> aiohttp.ClientSession:
+        """Return session shared by all clients."""
+        if self._session is None:
+            connector = aiohttp.TCPConnector(
+                limit_per_host=CONNECTION_LIMIT_PER_HOST,
+                ttl_dns_cache=DNS_CACHE_TTL,
+                keepalive_timeout=KEEPALIVE_TIMEOUT,
+                enable_cleanup_closed=True,
+                ssl=get_default_context(),
+            )
+            self._session = aiohttp.ClientSession(connector=connector)
+
+            async def async_close_session(event: Event) -> None:
+                self._cancel_close_listener = None
+                await self._async_close_session()
+
+            self._cancel_close_listener = self._hass.bus.async_listen_once(
+                EVENT_HOMEASSISTANT_CLOSE, async_close_session
+            )
+
+        return self._session
+
+    async def _async_close_session(self) -> None:
+        if self._cancel_close_listener is not None:
+            self._cancel_close_listener()
+            self._cancel_close_listener = None
+
+        session, self._session = self._session, None
+        if session is not None:
+            await session.close()
+
+
+@callback
+def async_get_client_registry(hass: HomeAssistant) -> TTLockClientRegistry:
+    """Return client registry of the integration."""
+    if DOMAIN_DATA not in hass.data:
+        hass.data[DOMAIN_DATA] = TTLockClientRegistry(hass)
+    return hass.data[DOMAIN_DATA]
@@ -0,0 +1,138 @@
+"""Optimistic lock commands with background confirmation for TTLock."""
+import asyncio
+import logging
+import time
+
+from homeassistant.core import HomeAssistant, callback
+
+from .rate_limiter import PRIORITY_COMMAND
+from .ttlock import extract_lock_status_from_records
+from .ttlock_api import TTLockError
+
+STATE_LOCKED = 0
+STATE_UNLOCKED = 1
+
+# Seconds to wait before every confirmation attempt
+CONFIRM_DELAYS = (1, 2, 4, 8)
+
+_LOGGER: logging.Logger = logging.getLogger(__package__)
+
+
+class TTLockCommands:
+    """Sends lock commands, shows them as pending until confirmed"""
+
+    def __init__(self, hass: HomeAssistant, coordinator) -> None:
+        """Initialize."""
+        self._hass = hass
+        self._coordinator = coordinator
+        # Target state of commands sent but not yet confirmed
+        self.pending = {}
+        self._sending = {}
+        self._confirmations = {}
+
+    async def async_command(self, lock_id, state: int) -> None:
+        """Lock or unlock, return once the lock accepted the command."""
+        while lock_id in self._sending:
+            task = self._sending[lock_id]
+            if self.pending.get(lock_id) == state:
+                # Repeated command, share the one in flight
+                await asyncio.shield(task)
+                return
+            # Opposite command, send it once the current one is accepted
+            await asyncio.wait([task])
+
+        if self.pending.get(lock_id) == state:
+            # Already accepted and waiting for confirmation
+            return
+
+        task = self._hass.async_create_task(self._async_send(lock_id, state))
+        self._sending[lock_id] = task
+        try:
+            await asyncio.shield(task)
+        finally:
+            if self._sending.get(lock_id) is task:
+                del self._sending[lock_id]
+
+    @callback
+    def async_cancel(self) -> None:
+        """Stop confirming sent commands."""
+        for task in self._confirmations.values():
+            task.cancel()
+        self._confirmations.clear()
+
+    async def _async_send(self, lock_id, state: int) -> None:
+        """Send command and start confirming it."""
+        confirmation = self._confirmations.pop(lock_id, None)
+        if confirmation is not None:
+            confirmation.cancel()
+
+        self._set_pending(lock_id, state)
+        sent_at = int(time.time() * 1000)
+        try:
+            if state == STATE_LOCKED:
+                await self._coordinator.api.lock_lock(lock_id)
+            else:
+                await self._coordinator.api.lock_unlock(lock_id)
+        except Exception:
+            self._set_pending(lock_id, None)
+            raise
+
+        self._coordinator.poll_scheduler.boost(lock_id)
+        self._confirmations[lock_id] = self._hass.async_create_background_task(
+            self._async_confirm(lock_id, state, sent_at),
+            f"integration_ttlock confirm {lock_id}",
+        )
+
+    async def _async_confirm(self, lock_id, state: int, sent_at: int) -> None:
+        """Apply commanded state once the lock reports it, roll back otherwise."""
+        try:
+            for delay in CONFIRM_DELAYS:
+                await asyncio.sleep(delay)
+                try:
+                    confirmed = await self._async_query_state(lock_id, sent_at)
+                except Exception as exception:  # pylint: disable=broad-except
+                    _LOGGER.debug("Confirming lock %s failed: %s", lock_id, exception)
+                    continue
+
+                if confirmed == state:
+                    self._set_pending(lock_id, None, state)
+                    return
+
+            _LOGGER.warning("Lock %s did not confirm state %s", lock_id, state)
+            self._set_pending(lock_id, None)
+        finally:
+            if self._confirmations.get(lock_id) is asyncio.current_task():
+                del self._confirmations[lock_id]
+
+    async def _async_query_state(self, lock_id, since: int) -> int:
+        """Return current lock state, from records when it cannot be queried."""
+        try:
+            response = await self._coordinator.api.query_open_state(
+                lock_id, priority=PRIORITY_COMMAND
+            )
+            return response["state"]
+        except TTLockError:
+            records = [
+                rec
+                async for rec in self._coordinator.api.iter_lock_records(lock_id, since)
+            ]
+            return extract_lock_status_from_records(records)[0]
+
+    @callback
+    def _set_pending(self, lock_id, pending, state: int = None) -> None:
+        """Set pending command of a lock, optionally applying confirmed state."""
+        if pending is None:
+            self.pending.pop(lock_id, None)
+        else:
+            self.pending[lock_id] = pending
+
+        state_store = self._coordinator.state_store
+        if (
+            state is not None
+            and state_store.states.get(lock_id, {}).get("state") != state
+        ):
+            self._coordinator.async_push_states(
+                {lock_id: {"state": state, "state_changed_by": None}}
+            )
+        else:
+            state_store.async_notify(lock_id, {"pending"})
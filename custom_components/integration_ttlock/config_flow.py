@@ -3,19 +3,36 @@ import logging
 from homeassistant import config_entries
 from homeassistant.core import callback
 from homeassistant.helpers.selector import selector
-from homeassistant.helpers.aiohttp_client import async_create_clientsession
 import voluptuous as vol
 
-from .ttlock_api import TTLockApiClient
+from .client_registry import async_get_client_registry
 
 from .const import (
+    CONF_ACCESS_TOKEN,
+    CONF_ACCESS_TOKEN_EXPIRES_AT,
+    CONF_API_SENSORS,
     CONF_CLIENT_ID,
     CONF_CLIENT_SECRET,
+    CONF_HISTORY_RETENTION_DAYS,
+    CONF_MAX_CONCURRENCY,
+    CONF_MAX_SCAN_INTERVAL,
+    CONF_MIN_SCAN_INTERVAL,
+    CONF_RATE_BURST,
+    CONF_RATE_LIMIT,
     CONF_REFRESH_TOKEN,
+    CONF_REFRESH_TYPE,
+    DEFAULT_HISTORY_RETENTION_DAYS,
+    DEFAULT_MAX_CONCURRENCY,
+    DEFAULT_MAX_SCAN_INTERVAL,
+    DEFAULT_MIN_SCAN_INTERVAL,
+    DEFAULT_RATE_BURST,
+    DEFAULT_RATE_LIMIT,
     INPUT_PASSWORD,
     CONF_SERVER,
     CONF_USERNAME,
     DOMAIN,
+    REFRESH_POLLING,
+    REFRESH_TYPES,
 )
 
 
@@ -41,20 +58,20 @@ class TTLockFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
         #     return self.async_abort(reason="single_instance_allowed")
 
         if user_input is not None:
-            token = await self._get_refresh_token(
+            tokens = await self._get_tokens(
                 user_input[CONF_SERVER],
                 user_input[CONF_CLIENT_ID],
                 user_input[CONF_CLIENT_SECRET],
                 user_input[CONF_USERNAME],
                 user_input[INPUT_PASSWORD],
             )
-            if token is not None:
+            if tokens is not None:
                 d = {
                     CONF_SERVER: user_input[CONF_SERVER],
                     CONF_CLIENT_ID: user_input[CONF_CLIENT_ID],
                     CONF_CLIENT_SECRET: user_input[CONF_CLIENT_SECRET],
                     CONF_USERNAME: user_input[CONF_USERNAME],
-                    CONF_REFRESH_TOKEN: token,
+                    **tokens,
                 }
                 return self.async_create_entry(
                     title=user_input[CONF_USERNAME],
@@ -104,18 +121,29 @@ class TTLockFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
             errors=self._errors,
         )
 
-    async def _get_refresh_token(
+    async def _get_tokens(
         self, url: str, client_id: str, client_secret: str, username: str, password: str
     ):
-        """Return refresh token if credentials is valid or None if invalid."""
+        """Return tokens if credentials is valid or None if invalid."""
+        tokens = {}
+
+        def on_new_token(access_token, expires_at, refresh_token):
+            tokens[CONF_ACCESS_TOKEN] = access_token
+            tokens[CONF_ACCESS_TOKEN_EXPIRES_AT] = expires_at
+            tokens[CONF_REFRESH_TOKEN] = refresh_token
+
+        registry = async_get_client_registry(self.hass)
+        client = registry.async_get_client(url, client_id, client_secret, username)
+        remove_callback = client.on_new_token(on_new_token)
         try:
-            session = async_create_clientsession(self.hass)
-            client = TTLockApiClient(url, client_id, client_secret, username, session)
             data = await client.async_authenticate(password, "password")
             if "refresh_token" in data:
-                return data["refresh_token"]
+                return tokens
         except Exception as exception:  # pylint: disable=broad-except
             _LOGGER.error("Exception %s", exception)
+        finally:
+            remove_callback()
+            await registry.async_release_client(client)
         return None
 
 
@@ -133,26 +161,67 @@ class TTLockOptionsFlowHandler(config_entries.OptionsFlow):
 
     async def async_step_user(self, user_input=None):
         """Handle a flow initialized by the user."""
+        errors = {}
         if user_input is not None:
-            self.options.update(user_input)
-            return await self._update_options()
+            if user_input[CONF_MAX_SCAN_INTERVAL] < user_input[CONF_MIN_SCAN_INTERVAL]:
+                errors["base"] = "scan_interval"
+            else:
+                self.options.update(user_input)
+                return await self._update_options()
 
         return self.async_show_form(
             step_id="user",
             data_schema=vol.Schema(
                 {
                     vol.Required(
-                        "refresh_type",
-                        default=self.options.get("refresh_type", "Polling"),
+                        CONF_REFRESH_TYPE,
+                        default=self.options.get(CONF_REFRESH_TYPE, REFRESH_POLLING),
                     ): selector(
                         {
                             "select": {
-                                "options": ["Polling", "Polling Logs", "Webhook Logs"],
+                                "options": REFRESH_TYPES,
                             }
                         }
-                    )
+                    ),
+                    vol.Required(
+                        CONF_MAX_CONCURRENCY,
+                        default=self.options.get(
+                            CONF_MAX_CONCURRENCY, DEFAULT_MAX_CONCURRENCY
+                        ),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=1, max=100)),
+                    vol.Required(
+                        CONF_RATE_LIMIT,
+                        default=self.options.get(CONF_RATE_LIMIT, DEFAULT_RATE_LIMIT),
+                    ): vol.All(vol.Coerce(float), vol.Range(min=0.1, max=100)),
+                    vol.Required(
+                        CONF_RATE_BURST,
+                        default=self.options.get(CONF_RATE_BURST, DEFAULT_RATE_BURST),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=1, max=1000)),
+                    vol.Required(
+                        CONF_MIN_SCAN_INTERVAL,
+                        default=self.options.get(
+                            CONF_MIN_SCAN_INTERVAL, DEFAULT_MIN_SCAN_INTERVAL
+                        ),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=5, max=3600)),
+                    vol.Required(
+                        CONF_MAX_SCAN_INTERVAL,
+                        default=self.options.get(
+                            CONF_MAX_SCAN_INTERVAL, DEFAULT_MAX_SCAN_INTERVAL
+                        ),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=5, max=86400)),
+                    vol.Required(
+                        CONF_HISTORY_RETENTION_DAYS,
+                        default=self.options.get(
+                            CONF_HISTORY_RETENTION_DAYS, DEFAULT_HISTORY_RETENTION_DAYS
+                        ),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=1, max=3650)),
+                    vol.Required(
+                        CONF_API_SENSORS,
+                        default=self.options.get(CONF_API_SENSORS, False),
+                    ): bool,
                 }
             ),
+            errors=errors,
         )
 
     async def _update_options(self):
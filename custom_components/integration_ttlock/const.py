@@ -7,6 +7,11 @@ VERSION = "0.0.1"
 ATTRIBUTION = "Data provided by http://jsonplaceholder.typicode.com/"
 ISSUE_URL = "https://github.com/nikolai5slo/integration_ttlock/issues"
 
+# Storage
+STORAGE_VERSION = 1
+RECORD_MARKS_SAVE_DELAY = 10
+SNAPSHOT_SAVE_DELAY = 30
+
 # Icons
 ICON = "mdi:format-quote-close"
 
@@ -23,12 +28,62 @@ CONF_CLIENT_ID = "client_id"
 CONF_CLIENT_SECRET = "client_secret"
 CONF_USERNAME = "username"
 CONF_REFRESH_TOKEN = "refresh_token"
+CONF_ACCESS_TOKEN = "access_token"
+CONF_ACCESS_TOKEN_EXPIRES_AT = "access_token_expires_at"
+CONF_REFRESH_TYPE = "refresh_type"
+CONF_MAX_CONCURRENCY = "max_concurrency"
+CONF_RATE_LIMIT = "rate_limit"
+CONF_RATE_BURST = "rate_burst"
+CONF_MIN_SCAN_INTERVAL = "min_scan_interval"
+CONF_MAX_SCAN_INTERVAL = "max_scan_interval"
+CONF_API_SENSORS = "api_sensors"
+CONF_HISTORY_RETENTION_DAYS = "history_retention_days"
+
+# Refresh types
+REFRESH_POLLING = "Polling"
+REFRESH_POLLING_LOGS = "Polling Logs"
+REFRESH_POLLING_ACCOUNT_LOGS = "Polling Account Logs"
+REFRESH_WEBHOOK_LOGS = "Webhook Logs"
+REFRESH_TYPES = [
+    REFRESH_POLLING,
+    REFRESH_POLLING_LOGS,
+    REFRESH_POLLING_ACCOUNT_LOGS,
+    REFRESH_WEBHOOK_LOGS,
+]
 
 # Input value
 INPUT_PASSWORD = "password"
 
+# Services
+SERVICE_BULK_LOCK = "bulk_lock"
+ATTR_ACTION = "action"
+ATTR_ALL = "all"
+ATTR_MAX_CONCURRENCY = "max_concurrency"
+
+# Events
+EVENT_RECORD = f"{DOMAIN}_record"
+
 # Defaults
 DEFAULT_NAME = DOMAIN
+DEFAULT_MAX_CONCURRENCY = 10
+DEFAULT_RATE_LIMIT = 5.0
+DEFAULT_RATE_BURST = 10
+DEFAULT_MIN_SCAN_INTERVAL = 15
+DEFAULT_MAX_SCAN_INTERVAL = 300
+DEFAULT_HISTORY_RETENTION_DAYS = 30
+DEFAULT_BULK_CONCURRENCY = 20
+# Seconds between lock list refreshes, independent of lock poll intervals
+LOCKS_REFRESH_INTERVAL = 30
+# Seconds between gateway map refreshes while locks and their gateway flags stay
+GATEWAYS_REFRESH_INTERVAL = 3600
+# Records to fetch when there is no previously seen record to start from
+RECORDS_INITIAL_LIMIT = 100
+ACCOUNT_RECORDS_LIMIT = 1000
+# Account records are fetched from this many seconds before the newest seen
+# record, records of locks with a clock behind by less are not missed
+ACCOUNT_RECORDS_SKEW_MARGIN = 3600
+# Record keys remembered per lock to fire every record event only once
+SEEN_RECORDS_PER_LOCK = 256
 
 
 STARTUP_MESSAGE = f"""
@@ -0,0 +1,58 @@
+"""Diagnostics support for TTLock."""
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import (
+    CONF_ACCESS_TOKEN,
+    CONF_CLIENT_ID,
+    CONF_CLIENT_SECRET,
+    CONF_REFRESH_TOKEN,
+    CONF_USERNAME,
+    DOMAIN,
+)
+
+TO_REDACT = {
+    CONF_ACCESS_TOKEN,
+    CONF_CLIENT_ID,
+    CONF_CLIENT_SECRET,
+    CONF_REFRESH_TOKEN,
+    CONF_USERNAME,
+}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict:
+    """Return diagnostics of a config entry."""
+    coordinator = hass.data[DOMAIN][entry.entry_id]
+    api = coordinator.api
+
+    rate_limiter = None
+    if api.rate_limiter is not None:
+        rate_limiter = {
+            "queue_depth": api.rate_limiter.queue_depth,
+            "max_queue_depth": api.rate_limiter.max_queue_depth,
+        }
+
+    return {
+        "entry": {
+            "data": async_redact_data(entry.data, TO_REDACT),
+            "options": dict(entry.options),
+        },
+        "coordinator": {
+            "last_update_success": coordinator.last_update_success,
+            "locks": len(coordinator.data["locks"]) if coordinator.data else 0,
+            "stale": coordinator.stale,
+            "entity_writes_performed": coordinator.entity_writes_performed,
+            "entity_writes_skipped": coordinator.entity_writes_skipped,
+        },
+        "api": {
+            "requests": api.telemetry.requests,
+            "retries": api.telemetry.retries,
+            "latency_ms": api.telemetry.latency_percentiles(),
+            "circuit_breaker": api.circuit_breaker.state,
+            "rate_limiter": rate_limiter,
+            "endpoints": api.telemetry.as_dict(),
+        },
+    }
@@ -8,6 +8,9 @@ from .const import DOMAIN
 class TTLockEntity(CoordinatorEntity):
     """TTLock Base entity"""
 
+    # Lock and state fields the entity depends on, None for all fields
+    relevant_fields = None
+
     def __init__(self, coordinator, config_entry, lock_data):
         super().__init__(coordinator)
         self.config_entry = config_entry
@@ -19,13 +22,39 @@ class TTLockEntity(CoordinatorEntity):
         """Return avalibility"""
         return self.lock_data is not None
 
+    async def async_added_to_hass(self) -> None:
+        """Subscribe to pushed state updates of this lock."""
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            self.coordinator.state_store.async_subscribe(
+                self.lock_id, self._handle_changed_fields
+            )
+        )
+
     @callback
     def _handle_coordinator_update(self) -> None:
         """Handle updated data from the coordinator."""
-        if self.lock_id in self.coordinator.data:
-            self.lock_data = self.coordinator.data[self.lock_id]
+        self._handle_changed_fields(self.coordinator.changed_fields.get(self.lock_id))
+
+    @callback
+    def _handle_changed_fields(self, fields) -> None:
+        """Write state when any of the relevant fields changed."""
+        if not fields or (
+            self.relevant_fields is not None and fields.isdisjoint(self.relevant_fields)
+        ):
+            self.coordinator.entity_writes_skipped += 1
+            return
+
+        if self.lock_id in self.coordinator.data["locks"]:
+            self.lock_data = self.coordinator.data["locks"][self.lock_id]
+        self.coordinator.entity_writes_performed += 1
         self.async_write_ha_state()
 
+    @property
+    def extra_state_attributes(self):
+        """Return whether data is from a snapshot not yet revalidated"""
+        return {"stale": self.coordinator.stale}
+
     @property
     def device_info(self):
         return {
@@ -0,0 +1,70 @@
+"""Lock record events for TTLock."""
+from collections import OrderedDict
+
+from homeassistant.const import ATTR_ENTITY_ID
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import entity_registry as er
+
+from .const import DOMAIN, EVENT_RECORD, LOCK, SEEN_RECORDS_PER_LOCK
+from .ttlock import record_key, record_type_info
+
+
+class TTLockRecordEvents:
+    """Fires an event for every lock record, once"""
+
+    def __init__(
+        self, hass: HomeAssistant, coordinator, max_seen: int = SEEN_RECORDS_PER_LOCK
+    ) -> None:
+        """Initialize."""
+        self._hass = hass
+        self._coordinator = coordinator
+        self._max_seen = max_seen
+        # Recently seen record keys of every lock, oldest first
+        self._seen = {}
+
+    @callback
+    def async_add(self, records, fire: bool = True) -> int:
+        """Fire events of records not seen before, return number of fired."""
+        fired = 0
+        for rec in sorted(records, key=lambda rec: rec["lockDate"]):
+            seen = self._seen.setdefault(rec["lockId"], OrderedDict())
+            key = record_key(rec)
+            if key in seen:
+                seen.move_to_end(key)
+                continue
+
+            seen[key] = None
+            if len(seen) > self._max_seen:
+                seen.popitem(last=False)
+
+            if fire:
+                self._hass.bus.async_fire(EVENT_RECORD, self._event_data(rec))
+                fired += 1
+
+        return fired
+
+    @callback
+    def async_forget(self, lock_ids) -> None:
+        """Drop seen records of all locks except lock_ids."""
+        for lock_id in set(self._seen) - set(lock_ids):
+            del self._seen[lock_id]
+
+    def _event_data(self, rec) -> dict:
+        """Return event data of a record."""
+        lock_id = rec["lockId"]
+        lock = (self._coordinator.data or {}).get("locks", {}).get(lock_id, {})
+        info = record_type_info(rec.get("recordType"))
+        return {
+            ATTR_ENTITY_ID: er.async_get(self._hass).async_get_entity_id(
+                LOCK, DOMAIN, f"{lock_id}_{LOCK}"
+            ),
+            "lock_id": lock_id,
+            "lock_name": lock.get("lockAlias", str(lock_id)),
+            "record_id": rec.get("recordId"),
+            "record_type": rec.get("recordType"),
+            "message": info.message,
+            "category": info.category,
+            "success": rec.get("success") == 1,
+            "username": rec.get("username"),
+            "lock_date": rec["lockDate"],
+        }
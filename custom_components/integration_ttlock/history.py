@@ -0,0 +1,122 @@
+"""Local lock record history for TTLock."""
+import json
+import sqlite3
+import threading
+import time
+
+from homeassistant.core import HomeAssistant
+
+from .ttlock import record_key
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    record_id TEXT PRIMARY KEY,
+    lock_id INTEGER NOT NULL,
+    lock_date INTEGER NOT NULL,
+    record_type INTEGER,
+    success INTEGER,
+    username TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS records_lock_date ON records (lock_id, lock_date);
+CREATE INDEX IF NOT EXISTS records_date ON records (lock_date);
+"""
+
+
+class TTLockHistory:
+    """SQLite store of lock records"""
+
+    def __init__(self, hass: HomeAssistant, path: str, retention_days: int) -> None:
+        """Initialize."""
+        self._hass = hass
+        self._path = path
+        self._retention_days = retention_days
+        self._connection = None
+        # Executor jobs run on different threads
+        self._lock = threading.Lock()
+
+    async def async_setup(self) -> None:
+        """Open database and create schema."""
+        await self._hass.async_add_executor_job(self._setup)
+
+    def _setup(self) -> None:
+        with self._lock:
+            self._connection = sqlite3.connect(self._path, check_same_thread=False)
+            self._connection.executescript(SCHEMA)
+
+    async def async_close(self) -> None:
+        """Close database."""
+        await self._hass.async_add_executor_job(self._close)
+
+    def _close(self) -> None:
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    async def async_add_records(self, records: list) -> None:
+        """Store records, skipping already stored ones."""
+        if records:
+            await self._hass.async_add_executor_job(self._add_records, records)
+
+    def _add_records(self, records: list) -> None:
+        rows = [
+            (
+                record_key(rec),
+                rec["lockId"],
+                rec["lockDate"],
+                rec.get("recordType"),
+                rec.get("success"),
+                rec.get("username"),
+                json.dumps(rec),
+            )
+            for rec in records
+        ]
+        with self._lock:
+            if self._connection is None:
+                # Closed on unload, records of a late job are not kept
+                return
+            with self._connection:
+                self._connection.executemany(
+                    "INSERT OR IGNORE INTO records VALUES (?, ?, ?, ?, ?, ?, ?)", rows
+                )
+
+    async def async_prune(self) -> int:
+        """Remove records older than retention, return number of removed."""
+        return await self._hass.async_add_executor_job(self._prune)
+
+    def _prune(self) -> int:
+        oldest = int((time.time() - self._retention_days * 86400) * 1000)
+        with self._lock:
+            if self._connection is None:
+                return 0
+            with self._connection:
+                cursor = self._connection.execute(
+                    "DELETE FROM records WHERE lock_date < ?", (oldest,)
+                )
+                return cursor.rowcount
+
+    async def async_last_records(self, lock_id, limit: int = 10) -> list:
+        """Return newest records of a lock."""
+        return await self._hass.async_add_executor_job(
+            self._query,
+            "SELECT data FROM records WHERE lock_id = ? "
+            "ORDER BY lock_date DESC LIMIT ?",
+            (lock_id, limit),
+        )
+
+    async def async_records_between(self, lock_id, start: int, end: int) -> list:
+        """Return records of a lock between start and end, newest first."""
+        return await self._hass.async_add_executor_job(
+            self._query,
+            "SELECT data FROM records WHERE lock_id = ? "
+            "AND lock_date BETWEEN ? AND ? ORDER BY lock_date DESC",
+            (lock_id, start, end),
+        )
+
+    def _query(self, sql: str, params: tuple) -> list:
+        with self._lock:
+            if self._connection is None:
+                return []
+            rows = self._connection.execute(sql, params).fetchall()
+        return [json.loads(row[0]) for row in rows]
@@ -0,0 +1,7 @@
+"""JSON decoding for TTLock API responses and callbacks."""
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
+__all__ = ["json_loads"]
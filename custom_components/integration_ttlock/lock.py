@@ -1,12 +1,7 @@
 """Binary sensor platform for integration_blueprint."""
 from homeassistant.components.lock import LockEntity
-from homeassistant.core import Context
-
-
-from custom_components.integration_ttlock.ttlock import (
-    extract_lock_status_from_records_with_lock_id,
-)
 
+from .commands import STATE_LOCKED, STATE_UNLOCKED
 from .const import (
     DOMAIN,
     LOCK,
@@ -18,42 +13,39 @@ async def async_setup_entry(hass, entry, async_add_devices):
     """Setup lock platform."""
     coordinator = hass.data[DOMAIN][entry.entry_id]
 
-    for lock_data in coordinator.data["locks"].values():
-        async_add_devices([TTLockLock(coordinator, entry, lock_data)])
+    async_add_devices(
+        [
+            TTLockLock(coordinator, entry, lock_data)
+            for lock_data in coordinator.data["locks"].values()
+        ]
+    )
 
 
 class TTLockLock(TTLockEntity, LockEntity):
     """integration_blueprint binary_sensor class."""
 
-    def __init__(self, coordinator, config_entry, lock_data):
-        super().__init__(coordinator, config_entry, lock_data)
+    relevant_fields = {
+        "lockAlias",
+        "lockName",
+        "lockMac",
+        "state",
+        "state_changed_by",
+        "stale",
+        "pending",
+    }
 
-        self.lock_state = 2
-        self.refresh_type = self.config_entry.options.get("refresh_type", "Polling")
-        self.lock_state_changed_by = None
-
-    async def async_update(self):
-        if self.refresh_type == "Polling":
-            response = await self.coordinator.api.query_open_state(self.lock_id)
-
-            if "state" in response:
-                self.lock_state = int(response["state"])
-                self.lock_state_changed_by = None
-        elif self.refresh_type == "Polling Logs":
-            records = await self.coordinator.api.list_lock_record(self.lock_id)
-            (
-                self.lock_state,
-                self.lock_state_changed_by,
-            ) = extract_lock_status_from_records_with_lock_id(self.lock_id, records)
+    @property
+    def lock_state_data(self):
+        """Return last known lock state from the coordinator."""
+        return self.coordinator.data["states"].get(self.lock_id, {})
 
     @property
-    def changed_by(self):
-        return self.lock_state_changed_by
+    def lock_state(self):
+        return self.lock_state_data.get("state", 2)
 
     @property
-    def should_poll(self):
-        """Should home assistant poll the data"""
-        return self.refresh_type in ["Polling", "Polling Logs"]
+    def changed_by(self):
+        return self.lock_state_data.get("state_changed_by")
 
     @property
     def is_locked(self):
@@ -62,6 +54,16 @@ class TTLockLock(TTLockEntity, LockEntity):
             return None
         return self.lock_state == 0
 
+    @property
+    def is_locking(self):
+        """Return true while a lock command is not yet confirmed"""
+        return self.coordinator.commands.pending.get(self.lock_id) == STATE_LOCKED
+
+    @property
+    def is_unlocking(self):
+        """Return true while an unlock command is not yet confirmed"""
+        return self.coordinator.commands.pending.get(self.lock_id) == STATE_UNLOCKED
+
     @property
     def name(self):
         """Return the name of the lock."""
@@ -74,8 +76,8 @@ class TTLockLock(TTLockEntity, LockEntity):
 
     async def async_lock(self, **kwargs):
         """Lock all or specified locks"""
-        await self.coordinator.api.lock_lock(self.lock_id)
+        await self.coordinator.commands.async_command(self.lock_id, STATE_LOCKED)
 
     async def async_unlock(self, **kwargs):
         """Lock all or specified locks"""
-        await self.coordinator.api.lock_unlock(self.lock_id)
+        await self.coordinator.commands.async_command(self.lock_id, STATE_UNLOCKED)
@@ -0,0 +1,27 @@
+"""Describe TTLock logbook events."""
+from homeassistant.const import ATTR_ENTITY_ID
+from homeassistant.core import Event, HomeAssistant, callback
+
+from .const import DOMAIN, EVENT_RECORD
+
+
+@callback
+def async_describe_events(hass: HomeAssistant, async_describe_event) -> None:
+    """Describe lock record events."""
+
+    @callback
+    def async_describe_record_event(event: Event) -> dict:
+        data = event.data
+        message = data["message"] or f"record type {data['record_type']}"
+        if data["username"]:
+            message = f"{message} ({data['username']})"
+        if not data["success"]:
+            message = f"{message}, failed"
+
+        description = {"name": data["lock_name"], "message": message}
+        if data[ATTR_ENTITY_ID]:
+            # Show entry in the logbook of the lock entity
+            description[ATTR_ENTITY_ID] = data[ATTR_ENTITY_ID]
+        return description
+
+    async_describe_event(DOMAIN, EVENT_RECORD, async_describe_record_event)
@@ -0,0 +1,90 @@
+"""Client side rate limiter for TTLock API."""
+import asyncio
+from collections import deque
+import time
+
+# Priority lanes, lower value is served first
+PRIORITY_COMMAND = 0
+PRIORITY_POLL = 1
+
+
+class TTLockRateLimiter:
+    """Token bucket rate limiter with priority lanes"""
+
+    def __init__(self, rate: float, burst: int) -> None:
+        """Allow rate requests per second with bursts of up to burst requests."""
+        self._rate = rate
+        self._burst = burst
+        self._tokens = float(burst)
+        self._updated_at = time.monotonic()
+        self._lanes = {PRIORITY_COMMAND: deque(), PRIORITY_POLL: deque()}
+        self._wakeup = None
+        self._max_queue_depth = {priority: 0 for priority in self._lanes}
+
+    @property
+    def limits(self) -> tuple:
+        """Return allowed requests per second and burst."""
+        return (self._rate, self._burst)
+
+    @property
+    def queue_depth(self) -> dict:
+        """Return number of requests waiting in every lane."""
+        return {priority: len(waiters) for priority, waiters in self._lanes.items()}
+
+    @property
+    def max_queue_depth(self) -> dict:
+        """Return highest number of requests that waited in every lane."""
+        return dict(self._max_queue_depth)
+
+    async def acquire(self, priority: int = PRIORITY_POLL) -> None:
+        """Wait until a request with given priority may be sent."""
+        self._refill()
+        if self._tokens >= 1 and not any(self._lanes.values()):
+            self._tokens -= 1
+            return
+
+        waiters = self._lanes[priority]
+        future = asyncio.get_running_loop().create_future()
+        waiters.append(future)
+        self._max_queue_depth[priority] = max(
+            self._max_queue_depth[priority], len(waiters)
+        )
+        self._schedule_wakeup()
+
+        await future
+
+    def _refill(self) -> None:
+        """Add tokens for the time passed since last refill."""
+        now = time.monotonic()
+        self._tokens = min(
+            self._burst, self._tokens + (now - self._updated_at) * self._rate
+        )
+        self._updated_at = now
+
+    def _schedule_wakeup(self) -> None:
+        """Schedule releasing waiters once the next token is available."""
+        if self._wakeup is not None:
+            return
+
+        delay = max(0, (1 - self._tokens) / self._rate)
+        self._wakeup = asyncio.get_running_loop().call_later(
+            delay, self._release_waiters
+        )
+
+    def _release_waiters(self) -> None:
+        """Hand out available tokens to waiters in priority order."""
+        self._wakeup = None
+        self._refill()
+
+        for priority in sorted(self._lanes):
+            waiters = self._lanes[priority]
+            while waiters and self._tokens >= 1:
+                future = waiters.popleft()
+                if future.done():
+                    # Waiter was cancelled
+                    continue
+                self._tokens -= 1
+                future.set_result(None)
+
+        if any(self._lanes.values()):
+            self._schedule_wakeup()
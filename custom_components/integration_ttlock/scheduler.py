@@ -0,0 +1,59 @@
+"""Activity adaptive poll scheduling for TTLock locks."""
+import time
+
+# Keep polling at minimum interval this long after activity
+ACTIVE_PERIOD = 300
+BACKOFF_FACTOR = 1.5
+# Polls happen on coordinator ticks, tolerate small tick jitter
+POLL_SLACK = 1
+
+
+class TTLockPollScheduler:
+    """Tracks when every lock is due for polling"""
+
+    def __init__(self, min_interval: float, max_interval: float) -> None:
+        """Poll between min_interval and max_interval seconds."""
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self._intervals = {}
+        self._next_poll = {}
+        self._active_until = {}
+
+    def is_due(self, lock_id, now: float = None) -> bool:
+        """Return true when lock should be polled."""
+        if now is None:
+            now = time.monotonic()
+        return now + POLL_SLACK >= self._next_poll.get(lock_id, 0)
+
+    def due_locks(self, lock_ids, now: float = None) -> list:
+        """Return locks that should be polled."""
+        if now is None:
+            now = time.monotonic()
+        return [lock_id for lock_id in lock_ids if self.is_due(lock_id, now)]
+
+    def boost(self, lock_id, now: float = None) -> None:
+        """Poll lock at minimum interval after a command or state change."""
+        if now is None:
+            now = time.monotonic()
+        self._active_until[lock_id] = now + ACTIVE_PERIOD
+        self._intervals[lock_id] = self.min_interval
+        self._next_poll[lock_id] = now
+
+    def record_poll(self, lock_id, changed: bool, now: float = None) -> None:
+        """Schedule next poll of a lock after it was polled."""
+        if now is None:
+            now = time.monotonic()
+
+        if changed:
+            self._active_until[lock_id] = now + ACTIVE_PERIOD
+
+        if now < self._active_until.get(lock_id, 0):
+            interval = self.min_interval
+        else:
+            interval = min(
+                self.max_interval,
+                self._intervals.get(lock_id, self.min_interval) * BACKOFF_FACTOR,
+            )
+
+        self._intervals[lock_id] = interval
+        self._next_poll[lock_id] = now + interval
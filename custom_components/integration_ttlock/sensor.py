@@ -1,23 +1,67 @@
 """Sensor platform for TTLock."""
-from homeassistant.components.sensor import SensorEntity, SensorDeviceClass
+from homeassistant.components.sensor import (
+    SensorDeviceClass,
+    SensorEntity,
+    SensorStateClass,
+)
+from homeassistant.const import EntityCategory, UnitOfTime
+from homeassistant.helpers.device_registry import DeviceEntryType
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
 from .const import (
+    CONF_API_SENSORS,
     DOMAIN,
 )
 from .entity import TTLockEntity
 
+# Key, name, unit, state class and value of API telemetry sensors
+API_SENSORS = (
+    (
+        "requests",
+        "API requests",
+        None,
+        SensorStateClass.TOTAL_INCREASING,
+        lambda telemetry: telemetry.requests,
+    ),
+    (
+        "retries",
+        "API retries",
+        None,
+        SensorStateClass.TOTAL_INCREASING,
+        lambda telemetry: telemetry.retries,
+    ),
+    (
+        "latency_p95",
+        "API latency p95",
+        UnitOfTime.MILLISECONDS,
+        SensorStateClass.MEASUREMENT,
+        lambda telemetry: telemetry.latency_percentiles()["p95"],
+    ),
+)
+
 
 async def async_setup_entry(hass, entry, async_add_devices):
     """Setup sensor platform."""
     coordinator = hass.data[DOMAIN][entry.entry_id]
 
-    for lock_data in coordinator.data["locks"].values():
-        async_add_devices([TTLockBatterySensor(coordinator, entry, lock_data)])
+    entities = [
+        TTLockBatterySensor(coordinator, entry, lock_data)
+        for lock_data in coordinator.data["locks"].values()
+    ]
+    if entry.options.get(CONF_API_SENSORS, False):
+        entities.extend(
+            TTLockApiSensor(coordinator, entry, *description)
+            for description in API_SENSORS
+        )
+
+    async_add_devices(entities)
 
 
 class TTLockBatterySensor(TTLockEntity, SensorEntity):
     """integration_blueprint binary_sensor class."""
 
+    relevant_fields = {"lockAlias", "lockName", "lockMac", "electricQuantity", "stale"}
+
     def __init__(self, coordinator, config_entry, lock_data):
         super().__init__(coordinator, config_entry, lock_data)
         self.lock_state = 2
@@ -39,3 +83,26 @@ class TTLockBatterySensor(TTLockEntity, SensorEntity):
     def unique_id(self):
         """Return a unique ID to use for this entity."""
         return str(self.lock_id) + "_battery"
+
+
+class TTLockApiSensor(CoordinatorEntity, SensorEntity):
+    """API telemetry sensor of a config entry"""
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+
+    def __init__(self, coordinator, config_entry, key, name, unit, state_class, value):
+        super().__init__(coordinator)
+        self._value = value
+        self._attr_name = name
+        self._attr_native_unit_of_measurement = unit
+        self._attr_state_class = state_class
+        self._attr_unique_id = f"{config_entry.entry_id}_api_{key}"
+        self._attr_device_info = {
+            "identifiers": {(DOMAIN, config_entry.entry_id)},
+            "name": f"TTLock API {config_entry.title}",
+            "entry_type": DeviceEntryType.SERVICE,
+        }
+
+    @property
+    def native_value(self):
+        return self._value(self.coordinator.api.telemetry)
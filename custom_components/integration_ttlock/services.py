@@ -0,0 +1,124 @@
+"""Services for TTLock."""
+import asyncio
+import time
+
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+    callback,
+)
+from homeassistant.helpers import config_validation as cv, entity_registry as er
+from homeassistant.helpers.service import async_extract_referenced_entity_ids
+import voluptuous as vol
+
+from .commands import STATE_LOCKED, STATE_UNLOCKED
+from .const import (
+    ATTR_ACTION,
+    ATTR_ALL,
+    ATTR_MAX_CONCURRENCY,
+    DEFAULT_BULK_CONCURRENCY,
+    DOMAIN,
+    LOCK,
+    SERVICE_BULK_LOCK,
+)
+
+ACTIONS = {"lock": STATE_LOCKED, "unlock": STATE_UNLOCKED}
+
+BULK_LOCK_SCHEMA = vol.Schema(
+    {
+        **cv.ENTITY_SERVICE_FIELDS,
+        vol.Optional(ATTR_ACTION, default="lock"): vol.In(ACTIONS),
+        vol.Optional(ATTR_ALL, default=False): cv.boolean,
+        vol.Optional(ATTR_MAX_CONCURRENCY, default=DEFAULT_BULK_CONCURRENCY): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=100)
+        ),
+    }
+)
+
+
+@callback
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register integration services."""
+
+    async def async_bulk_lock(call: ServiceCall) -> ServiceResponse:
+        return await async_run_bulk_command(
+            _async_target_locks(hass, call),
+            ACTIONS[call.data[ATTR_ACTION]],
+            call.data[ATTR_MAX_CONCURRENCY],
+        )
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_BULK_LOCK,
+        async_bulk_lock,
+        schema=BULK_LOCK_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+
+
+@callback
+def _async_target_locks(hass: HomeAssistant, call: ServiceCall) -> list:
+    """Return entity id, coordinator and lock id of every targeted lock."""
+    coordinators = hass.data.get(DOMAIN, {})
+    if call.data[ATTR_ALL]:
+        entity_ids = None
+    else:
+        # Resolves areas and devices to their entities
+        selected = async_extract_referenced_entity_ids(hass, call)
+        entity_ids = selected.referenced | selected.indirectly_referenced
+
+    locks = []
+    for entry in er.async_get(hass).entities.values():
+        if (
+            entry.platform != DOMAIN
+            or entry.domain != LOCK
+            or entry.config_entry_id not in coordinators
+            or (entity_ids is not None and entry.entity_id not in entity_ids)
+        ):
+            continue
+
+        coordinator = coordinators[entry.config_entry_id]
+        lock_id = int(entry.unique_id.removesuffix(f"_{LOCK}"))
+        if lock_id in coordinator.data["locks"]:
+            locks.append((entry.entity_id, coordinator, lock_id))
+
+    return locks
+
+
+async def async_run_bulk_command(locks: list, state: int, max_concurrency: int) -> dict:
+    """Send command to all locks, one at a time per gateway, return results."""
+    semaphore = asyncio.Semaphore(max_concurrency)
+    results = {}
+
+    # Gateways relay commands to their locks one at a time
+    lanes = {}
+    for entity_id, coordinator, lock_id in locks:
+        lanes.setdefault(coordinator.gateway_for(lock_id), []).append(
+            (entity_id, coordinator, lock_id)
+        )
+
+    async def run_lane(lane_locks: list) -> None:
+        for entity_id, coordinator, lock_id in lane_locks:
+            async with semaphore:
+                started = time.monotonic()
+                result = {"lock_id": lock_id, "success": True}
+                try:
+                    await coordinator.commands.async_command(lock_id, state)
+                except Exception as exception:  # pylint: disable=broad-except
+                    result["success"] = False
+                    result["error"] = str(exception) or type(exception).__name__
+                result["elapsed_ms"] = round((time.monotonic() - started) * 1000)
+                results[entity_id] = result
+
+    started = time.monotonic()
+    await asyncio.gather(*(run_lane(lane_locks) for lane_locks in lanes.values()))
+
+    succeeded = sum(result["success"] for result in results.values())
+    return {
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+        "elapsed_ms": round((time.monotonic() - started) * 1000),
+        "results": results,
+    }
@@ -0,0 +1,62 @@
+"""Per lock state store for TTLock."""
+from homeassistant.core import CALLBACK_TYPE, callback
+
+from .ttlock import changed_fields
+
+
+class TTLockStateStore:
+    """Versioned lock states with per lock subscribers"""
+
+    def __init__(self) -> None:
+        """Initialize."""
+        self.states = {}
+        self._versions = {}
+        self._subscribers = {}
+
+    def version(self, lock_id) -> int:
+        """Return number of changes of lock state."""
+        return self._versions.get(lock_id, 0)
+
+    def versions(self) -> dict:
+        """Return number of changes of every lock state."""
+        return dict(self._versions)
+
+    @callback
+    def async_subscribe(self, lock_id, update_callback) -> CALLBACK_TYPE:
+        """Call update_callback with changed fields when lock state changes."""
+        subscribers = self._subscribers.setdefault(lock_id, set())
+        subscribers.add(update_callback)
+
+        @callback
+        def unsubscribe() -> None:
+            subscribers.discard(update_callback)
+            if not subscribers:
+                self._subscribers.pop(lock_id, None)
+
+        return unsubscribe
+
+    def replace(self, states: dict) -> None:
+        """Replace states of all locks without notifying subscribers."""
+        for lock_id, state in states.items():
+            if self.states.get(lock_id) != state:
+                self._versions[lock_id] = self.version(lock_id) + 1
+
+        self.states.clear()
+        self.states.update(states)
+
+    @callback
+    def async_set(self, lock_id, state: dict) -> None:
+        """Set state of a single lock and notify only its subscribers."""
+        fields = changed_fields(self.states.get(lock_id, {}), state)
+        if not fields:
+            return
+
+        self.states[lock_id] = state
+        self._versions[lock_id] = self.version(lock_id) + 1
+        self.async_notify(lock_id, fields)
+
+    @callback
+    def async_notify(self, lock_id, fields: set) -> None:
+        """Notify subscribers of a lock about fields changed outside its state."""
+        for update_callback in list(self._subscribers.get(lock_id, ())):
+            update_callback(fields)
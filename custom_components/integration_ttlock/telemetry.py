@@ -0,0 +1,101 @@
+"""Per endpoint request telemetry for TTLock API."""
+from collections import Counter, deque
+import math
+
+# Latency percentiles are computed over this many most recent requests
+LATENCY_SAMPLES = 1000
+PERCENTILES = (50, 95, 99)
+
+
+class TTLockEndpointStats:
+    """Request statistics of a single API endpoint"""
+
+    def __init__(self) -> None:
+        """Initialize."""
+        self.requests = 0
+        self.retries = 0
+        self.bytes_received = 0
+        self.errcodes = Counter()
+        self.exceptions = Counter()
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+
+    def record_response(self, latency: float, size: int, errcode=None) -> None:
+        """Count a request that returned a response."""
+        self.requests += 1
+        self.bytes_received += size
+        self.latencies.append(latency)
+        if errcode is not None:
+            self.errcodes[errcode] += 1
+
+    def record_exception(self, latency: float, exception: Exception) -> None:
+        """Count a request that failed without a response."""
+        self.requests += 1
+        self.latencies.append(latency)
+        self.exceptions[type(exception).__name__] += 1
+
+    def as_dict(self) -> dict:
+        """Return statistics as JSON serializable dict."""
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "bytes_received": self.bytes_received,
+            "latency_ms": latency_percentiles(self.latencies),
+            "errcodes": {str(code): count for code, count in self.errcodes.items()},
+            "exceptions": dict(self.exceptions),
+        }
+
+
+class TTLockTelemetry:
+    """Request statistics of all endpoints of an API client"""
+
+    def __init__(self) -> None:
+        """Initialize."""
+        self.endpoints = {}
+
+    def endpoint(self, endpoint: str) -> TTLockEndpointStats:
+        """Return statistics of an endpoint."""
+        if endpoint not in self.endpoints:
+            self.endpoints[endpoint] = TTLockEndpointStats()
+        return self.endpoints[endpoint]
+
+    @property
+    def requests(self) -> int:
+        """Return number of requests to all endpoints."""
+        return sum(stats.requests for stats in self.endpoints.values())
+
+    @property
+    def retries(self) -> int:
+        """Return number of retried requests to all endpoints."""
+        return sum(stats.retries for stats in self.endpoints.values())
+
+    def latency_percentiles(self) -> dict:
+        """Return recent latency percentiles over all endpoints."""
+        return latency_percentiles(
+            [
+                latency
+                for stats in self.endpoints.values()
+                for latency in stats.latencies
+            ]
+        )
+
+    def as_dict(self) -> dict:
+        """Return statistics of all endpoints as JSON serializable dict."""
+        return {
+            endpoint: stats.as_dict()
+            for endpoint, stats in sorted(self.endpoints.items())
+        }
+
+
+def latency_percentiles(latencies) -> dict:
+    """Return latency percentiles in milliseconds."""
+    latencies = sorted(latencies)
+    if not latencies:
+        return {f"p{percentile}": None for percentile in PERCENTILES}
+
+    # Nearest rank percentile
+    return {
+        f"p{percentile}": round(
+            latencies[math.ceil(percentile / 100 * len(latencies)) - 1] * 1000, 1
+        )
+        for percentile in PERCENTILES
+    }
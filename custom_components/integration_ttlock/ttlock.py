@@ -1,106 +1,221 @@
-unlock_record_types = [1, 4, 7, 8, 9, 10, 12, 46, 49, 50, 55, 57, 58, 63]
-lock_record_types = [11, 33, 34, 35, 36, 45, 47, 48, 61, 62]
+"""TTLock record helpers."""
+from array import array
+from typing import NamedTuple
 
+# Effect of a record on the lock, values match lock states
+EFFECT_LOCK = 0
+EFFECT_UNLOCK = 1
+EFFECT_NONE = 2
 
-def extract_lock_status_from_records_with_lock_id(lock_id, records):
+CATEGORY_UNLOCK = "unlock"
+CATEGORY_LOCK = "lock"
+CATEGORY_PARKING = "parking"
+CATEGORY_TAMPER = "tamper"
+CATEGORY_DOOR_SENSOR = "door_sensor"
+CATEGORY_MAIL = "mail"
+CATEGORY_ALARM = "alarm"
+CATEGORY_DOUBLE_LOCK = "double_lock"
+CATEGORY_OTHER = "other"
+
+# Record fields the integration reads, the API returns many more
+RECORD_FIELDS = ("recordId", "lockId", "lockDate", "recordType", "success", "username")
+
+
+class RecordType(NamedTuple):
+    """Record type description"""
+
+    message: str
+    effect: int
+    category: str
+
+
+RECORD_TYPES = {
+    1: RecordType("unlock by app", EFFECT_UNLOCK, CATEGORY_UNLOCK),
+    4: RecordType("unlock by passcode", EFFECT_UNLOCK, CATEGORY_UNLOCK),
+    5: RecordType("Rise the lock (for parking lock)", EFFECT_NONE, CATEGORY_PARKING),
+    6: RecordType("Lower the lock (for parking lock)", EFFECT_NONE, CATEGORY_PARKING),
+    7: RecordType("unlock by IC card", EFFECT_UNLOCK, CATEGORY_UNLOCK),
+    8: RecordType("unlock by fingerprint", EFFECT_UNLOCK, CATEGORY_UNLOCK),
+    9: RecordType("unlock by wrist strap", EFFECT_UNLOCK, CATEGORY_UNLOCK),
+    10: RecordType("unlock by Mechanical key", EFFECT_UNLOCK, CATEGORY_UNLOCK),
+    11: RecordType("lock by app", EFFECT_LOCK, CATEGORY_LOCK),
+    12: RecordType("unlock by gateway", EFFECT_UNLOCK, CATEGORY_UNLOCK),
+    29: RecordType("apply some force on the Lock", EFFECT_NONE, CATEGORY_TAMPER),
+    30: RecordType("Door sensor closed", EFFECT_NONE, CATEGORY_DOOR_SENSOR),
+    31: RecordType("Door sensor open", EFFECT_NONE, CATEGORY_DOOR_SENSOR),
+    32: RecordType("open from inside", EFFECT_NONE, CATEGORY_OTHER),
+    33: RecordType("lock by fingerprint", EFFECT_LOCK, CATEGORY_LOCK),
+    34: RecordType("lock by passcode", EFFECT_LOCK, CATEGORY_LOCK),
+    35: RecordType("lock by IC card", EFFECT_LOCK, CATEGORY_LOCK),
+    36: RecordType("lock by Mechanical key", EFFECT_LOCK, CATEGORY_LOCK),
+    37: RecordType("Remote Control", EFFECT_NONE, CATEGORY_OTHER),
+    42: RecordType("received new local mail", EFFECT_NONE, CATEGORY_MAIL),
+    43: RecordType("received new other cities' mail", EFFECT_NONE, CATEGORY_MAIL),
+    44: RecordType("Tamper alert", EFFECT_NONE, CATEGORY_TAMPER),
+    45: RecordType("Auto Lock", EFFECT_LOCK, CATEGORY_LOCK),
+    46: RecordType("unlock by unlock key", EFFECT_UNLOCK, CATEGORY_UNLOCK),
+    47: RecordType("lock by lock key", EFFECT_LOCK, CATEGORY_LOCK),
+    48: RecordType(
+        "System locked ( Caused by, for example: Using INVALID Passcode/Fingerprint/Card several times)",
+        EFFECT_LOCK,
+        CATEGORY_ALARM,
+    ),
+    49: RecordType("unlock by hotel card", EFFECT_UNLOCK, CATEGORY_UNLOCK),
+    50: RecordType(
+        "Unlocked due to the high temperature", EFFECT_UNLOCK, CATEGORY_UNLOCK
+    ),
+    52: RecordType("Dead lock with APP", EFFECT_NONE, CATEGORY_DOUBLE_LOCK),
+    53: RecordType("Dead lock with passcode", EFFECT_NONE, CATEGORY_DOUBLE_LOCK),
+    54: RecordType("The car left (for parking lock)", EFFECT_NONE, CATEGORY_PARKING),
+    55: RecordType("unlock with key fob", EFFECT_UNLOCK, CATEGORY_UNLOCK),
+    57: RecordType("Unlock with QR code success", EFFECT_UNLOCK, CATEGORY_UNLOCK),
+    58: RecordType(
+        "Unlock with QR code failed, it's expired", EFFECT_UNLOCK, CATEGORY_UNLOCK
+    ),
+    59: RecordType("Double locked", EFFECT_NONE, CATEGORY_DOUBLE_LOCK),
+    60: RecordType("Cancel double lock", EFFECT_NONE, CATEGORY_DOUBLE_LOCK),
+    61: RecordType("Lock with QR code success", EFFECT_LOCK, CATEGORY_LOCK),
+    62: RecordType(
+        "Lock with QR code failed, the lock is double locked",
+        EFFECT_LOCK,
+        CATEGORY_LOCK,
+    ),
+    63: RecordType("Auto unlock at passage mode", EFFECT_UNLOCK, CATEGORY_UNLOCK),
+}
+
+UNKNOWN_RECORD_TYPE = RecordType("", EFFECT_NONE, CATEGORY_OTHER)
+
+unlock_record_types = frozenset(
+    typ for typ, info in RECORD_TYPES.items() if info.effect == EFFECT_UNLOCK
+)
+lock_record_types = frozenset(
+    typ for typ, info in RECORD_TYPES.items() if info.effect == EFFECT_LOCK
+)
+
+# Flat lookup for hot paths
+_RECORD_EFFECTS = {typ: info.effect for typ, info in RECORD_TYPES.items()}
+
+
+def record_type_info(typ: int) -> RecordType:
+    """Returns description of a record type"""
+    return RECORD_TYPES.get(typ, UNKNOWN_RECORD_TYPE)
+
+
+def classify_records(records):
+    """Returns compact array of lock effects of all records"""
+    effects = _RECORD_EFFECTS
+    return array("b", [effects.get(rec["recordType"], EFFECT_NONE) for rec in records])
+
+
+def extract_lock_status_from_records_with_lock_id(
+    lock_id, records, newest_first: bool = False
+):
     """Extracts latest lock status from records"""
-    records = filter(lambda x: x["lockId"] == lock_id and x["success"] == 1, records)
+    records = filter(lambda x: x["lockId"] == lock_id, records)
 
+    if newest_first:
+        return extract_lock_status_from_pages([records])
     return extract_lock_status_from_records(records)
 
 
 def extract_lock_status_from_records(records):
-    """Extracts latest lock status from records"""
-    records = sorted(records, key=lambda x: x["lockDate"], reverse=True)
+    """Extracts latest lock status from successful records in any order"""
+    effects = _RECORD_EFFECTS
+    latest = None
+    latest_effect = EFFECT_NONE
 
     for rec in records:
-        rec_type = rec["recordType"]
-        if rec_type in unlock_record_types:
-            return (1, rec["username"])
-        if rec_type in lock_record_types:
-            return (0, rec["username"])
+        effect = effects.get(rec["recordType"], EFFECT_NONE)
+        if (
+            effect != EFFECT_NONE
+            and rec["success"] == 1
+            and (latest is None or rec["lockDate"] > latest["lockDate"])
+        ):
+            latest = rec
+            latest_effect = effect
+
+    if latest is None:
+        return (2, "")
+
+    return (latest_effect, latest["username"])
+
+
+def extract_lock_status_from_pages(pages):
+    """Extracts latest lock status from pages of records in newest first order"""
+    effects = _RECORD_EFFECTS
+
+    for page in pages:
+        for rec in page:
+            effect = effects.get(rec["recordType"], EFFECT_NONE)
+            if effect != EFFECT_NONE and rec["success"] == 1:
+                # Everything after this record is older
+                return (effect, rec["username"])
 
     return (2, "")
 
 
-def record_type_to_message(typ: str) -> str:
+def project_record(rec) -> dict:
+    """Returns record with only the fields the integration reads"""
+    return {field: rec[field] for field in RECORD_FIELDS if field in rec}
+
+
+def has_gateway(lock) -> bool:
+    """Returns true when lock state can be queried through a gateway"""
+    return lock.get("hasGateway", 1) != 0
+
+
+def is_state_record(rec) -> bool:
+    """Returns true when a successful record locks or unlocks the lock"""
+    return (
+        rec["success"] == 1
+        and _RECORD_EFFECTS.get(rec["recordType"], EFFECT_NONE) != EFFECT_NONE
+    )
+
+
+def record_key(rec) -> str:
+    """Returns unique key of a record, also for records without recordId"""
+    if "recordId" in rec:
+        return str(rec["recordId"])
+
+    return f"{rec['lockId']}-{rec['lockDate']}-{rec['recordType']}"
+
+
+def group_records_by_lock_id(records):
+    """Groups records by lockId in a single pass"""
+    grouped = {}
+    for rec in records:
+        grouped.setdefault(rec["lockId"], []).append(rec)
+
+    return grouped
+
+
+def record_position(rec) -> tuple:
+    """Returns (lockDate, recordId) of a record, callbacks carry no recordId"""
+    return (rec["lockDate"], rec.get("recordId", 0))
+
+
+def filter_records_after(records, mark):
+    """Returns records newer than the (lockDate, recordId) mark"""
+    if mark is None:
+        return list(records)
+
+    position = (mark["lockDate"], mark["recordId"])
+    return [rec for rec in records if record_position(rec) > position]
+
+
+def newest_record(records):
+    """Returns the newest record by lockDate and recordId"""
+    return max(records, key=record_position, default=None)
+
+
+def changed_fields(old, new):
+    """Returns names of fields that differ between two payloads"""
+    if old is None:
+        return set(new)
+
+    return {key for key in old.keys() | new.keys() if old.get(key) != new.get(key)}
+
+
+def record_type_to_message(typ: int) -> str:
     """Convert record type to message"""
-    if typ == 1:
-        return "unlock by app"
-    if typ == 4:
-        return "unlock by passcode"
-    if typ == 5:
-        return "Rise the lock (for parking lock)"
-    if typ == 6:
-        return "Lower the lock (for parking lock)"
-    if typ == 7:
-        return "unlock by IC card"
-    if typ == 8:
-        return "unlock by fingerprint"
-    if typ == 9:
-        return "unlock by wrist strap"
-    if typ == 10:
-        return "unlock by Mechanical key"
-    if typ == 11:
-        return "lock by app"
-    if typ == 12:
-        return "unlock by gateway"
-    if typ == 29:
-        return "apply some force on the Lock"
-    if typ == 30:
-        return "Door sensor closed"
-    if typ == 31:
-        return "Door sensor open"
-    if typ == 32:
-        return "open from inside"
-    if typ == 33:
-        return "lock by fingerprint"
-    if typ == 34:
-        return "lock by passcode"
-    if typ == 35:
-        return "lock by IC card"
-    if typ == 36:
-        return "lock by Mechanical key"
-    if typ == 37:
-        return "Remote Control"
-    if typ == 42:
-        return "received new local mail"
-    if typ == 43:
-        return "received new other cities' mail"
-    if typ == 44:
-        return "Tamper alert"
-    if typ == 45:
-        return "Auto Lock"
-    if typ == 46:
-        return "unlock by unlock key"
-    if typ == 47:
-        return "lock by lock key"
-    if typ == 48:
-        return "System locked ( Caused by, for example: Using INVALID Passcode/Fingerprint/Card several times)"
-    if typ == 49:
-        return "unlock by hotel card"
-    if typ == 50:
-        return "Unlocked due to the high temperature"
-    if typ == 52:
-        return "Dead lock with APP"
-    if typ == 53:
-        return "Dead lock with passcode"
-    if typ == 54:
-        return "The car left (for parking lock)"
-    if typ == 55:
-        return "unlock with key fob"
-    if typ == 57:
-        return "Unlock with QR code success"
-    if typ == 58:
-        return "Unlock with QR code failed, it's expired"
-    if typ == 59:
-        return "Double locked"
-    if typ == 60:
-        return "Cancel double lock"
-    if typ == 61:
-        return "Lock with QR code success"
-    if typ == 62:
-        return "Lock with QR code failed, the lock is double locked"
-    if typ == 63:
-        return "Auto unlock at passage mode"
-    return ""
+    return RECORD_TYPES.get(typ, UNKNOWN_RECORD_TYPE).message
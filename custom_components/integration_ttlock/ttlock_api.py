@@ -1,17 +1,38 @@
 """Sample API Client."""
+import asyncio
 from hashlib import md5
 import logging
+import random
 import aiohttp
 import async_timeout
 import time
 from urllib.parse import urljoin, urlencode
 
+from .circuit_breaker import TTLockCircuitBreaker, get_circuit_breaker
+from .rate_limiter import PRIORITY_COMMAND, PRIORITY_POLL, TTLockRateLimiter
+from .json_utils import json_loads
+from .telemetry import TTLockTelemetry
+
 TIMEOUT = 20
+LOCK_PAGE_SIZE = 1000
+RECORD_PAGE_SIZE = 100
+GATEWAY_PAGE_SIZE = 100
+MAX_RETRIES = 3
+RETRY_BACKOFF = 0.5
+RETRY_BACKOFF_MAX = 10
+# Refresh access token this many seconds before it expires
+TOKEN_REFRESH_MARGIN = 300
 
 _LOGGER: logging.Logger = logging.getLogger(__package__)
 
 HEADERS = {"Content-type": "application/json; charset=UTF-8"}
 
+# Error codes of temporary failures, request is retried
+RETRYABLE_ERRCODES = {
+    -3003: "Gateway is busy",
+    90000: "Internal server error",
+}
+
 
 class TTLockApiClient:
     """TTLock API Client"""
@@ -23,6 +44,7 @@ class TTLockApiClient:
         client_secret: str,
         username: str,
         session: aiohttp.ClientSession,
+        rate_limiter: TTLockRateLimiter = None,
     ) -> None:
         """Sample API Client."""
         self._server_url = server_url
@@ -30,13 +52,45 @@ class TTLockApiClient:
         self._client_secret = client_secret
         self._username = username
         self._session = session
+        self._rate_limiter = rate_limiter
+        self._circuit_breaker = get_circuit_breaker(server_url)
+        self.telemetry = TTLockTelemetry()
         self._access_token = None
         self._refresh_token = None
-        self._on_refresh_token_callback = lambda _: None
-
-    def on_new_refresh_token(self, callback: callable):
-        """set refresh token callback"""
-        self._on_refresh_token_callback = callback
+        self._access_token_expires_at = None
+        self._refresh_lock = asyncio.Lock()
+        self._token_callbacks = []
+
+    @property
+    def rate_limiter(self) -> TTLockRateLimiter:
+        """Return rate limiter shared by requests of this client."""
+        return self._rate_limiter
+
+    @property
+    def circuit_breaker(self) -> TTLockCircuitBreaker:
+        """Return circuit breaker of the API server."""
+        return self._circuit_breaker
+
+    @property
+    def tokens(self) -> tuple:
+        """Return access token, its expiry and refresh token."""
+        return self._access_token, self._access_token_expires_at, self._refresh_token
+
+    def on_new_token(self, callback: callable) -> callable:
+        """Add callback called with access token, its expiry and refresh token.
+
+        Returns function removing the callback.
+        """
+        self._token_callbacks.append(callback)
+        return lambda: self._token_callbacks.remove(callback)
+
+    def set_tokens(
+        self, access_token: str, expires_at: float, refresh_token: str
+    ) -> None:
+        """Use previously issued tokens, refreshed on demand when expiring."""
+        self._access_token = access_token
+        self._access_token_expires_at = expires_at
+        self._refresh_token = refresh_token
 
     async def async_authenticate(self, secret: str, typ: str) -> dict:
         """Authenticate with password or refresh token."""
@@ -56,127 +110,296 @@ class TTLockApiClient:
         headers = {"Content-Type": "application/x-www-form-urlencoded"}
 
         response = await self._api_wrapper(
-            "post", "/oauth2/token", data=data, headers=headers
+            "post",
+            "/oauth2/token",
+            data=data,
+            headers=headers,
+            priority=PRIORITY_COMMAND,
         )
 
         if "refresh_token" in response:
             self._refresh_token = response["refresh_token"]
-            self._on_refresh_token_callback(self._refresh_token)
 
         if "access_token" in response:
             self._access_token = response["access_token"]
+            if "expires_in" in response:
+                self._access_token_expires_at = time.time() + int(
+                    response["expires_in"]
+                )
+
+        if "refresh_token" in response or "access_token" in response:
+            for callback in list(self._token_callbacks):
+                callback(
+                    self._access_token,
+                    self._access_token_expires_at,
+                    self._refresh_token,
+                )
 
         return response
 
+    async def async_ensure_access_token(self) -> bool:
+        """Refresh access token only when missing or expiring."""
+        if self._access_token_expiring():
+            try:
+                await self._async_refresh_access_token(self._access_token)
+            except PermissionError:
+                return False
+
+        return self._access_token is not None
+
+    def _access_token_expiring(self) -> bool:
+        """Return true when access token is missing or about to expire."""
+        if self._access_token is None:
+            return self._refresh_token is not None
+
+        return (
+            self._access_token_expires_at is not None
+            and time.time() >= self._access_token_expires_at - TOKEN_REFRESH_MARGIN
+        )
+
+    async def _async_refresh_access_token(self, stale_token: str) -> None:
+        """Refresh access token once for all callers holding the stale token."""
+        async with self._refresh_lock:
+            if self._access_token != stale_token:
+                # Already refreshed by another caller
+                return
+
+            auth_response = await self.async_authenticate(
+                self._refresh_token, "refresh_token"
+            )
+            if "access_token" not in auth_response:
+                raise PermissionError("cannot refresh token")
+
     async def _auth_wrapper(
-        self, method: str, url: str, data: dict = None, headers: dict = None
+        self,
+        method: str,
+        url: str,
+        data: dict = None,
+        headers: dict = None,
+        priority: int = PRIORITY_POLL,
     ) -> dict:
         """Wrap api call with authentication"""
 
+        if self._access_token_expiring():
+            try:
+                await self._async_refresh_access_token(self._access_token)
+            except PermissionError as exception:
+                # Current token is still valid for a while, retry on next call
+                _LOGGER.warning("Proactive token refresh failed: %s", exception)
+
         if data is None:
             data = {}
+        access_token = self._access_token
         data["clientId"] = self._client_id
-        data["accessToken"] = self._access_token
+        data["accessToken"] = access_token
 
-        response = await self._api_wrapper(method, url, data, headers)
+        response = await self._api_wrapper(method, url, data, headers, priority)
 
         # Check if token is invalid
         if "errcode" in response and response["errcode"] == 10003:
-            # Get new token
-            auth_response = await self.async_authenticate(
-                self._refresh_token, "refresh_token"
-            )
-            if "access_token" in auth_response:
-                # Update this request tokens
-                data["clientId"] = self._client_id
-                data["accessToken"] = self._access_token
+            # Get new token, shared with concurrent failed requests
+            await self._async_refresh_access_token(access_token)
 
-                # Retry request
-                response = self._api_wrapper(method, url, data, headers)
-            else:
-                raise PermissionError("cannot refresh token")
+            # Update this request tokens and retry request
+            data["accessToken"] = self._access_token
+            response = await self._api_wrapper(method, url, data, headers, priority)
 
         return response
 
     async def _api_wrapper(
-        self, method: str, url: str, data: dict = None, headers: dict = None
+        self,
+        method: str,
+        url: str,
+        data: dict = None,
+        headers: dict = None,
+        priority: int = PRIORITY_POLL,
     ) -> dict:
-        """Get information from the API."""
+        """Get information from the API, retrying temporary failures."""
         if data is None:
             data = {}
         if headers is None:
             headers = {}
 
+        stats = self.telemetry.endpoint(url)
         url = urljoin(self._server_url, url)
 
+        attempt = 0
+        while True:
+            if not self._circuit_breaker.allow_request():
+                raise TTLockCircuitOpenError(self._server_url)
+
+            if self._rate_limiter is not None:
+                await self._rate_limiter.acquire(priority)
+
+            started = time.monotonic()
+            try:
+                body = await self._send_request(method, url, data, headers)
+                response = json_loads(body)
+            except (asyncio.TimeoutError, aiohttp.ClientError, ValueError) as exception:
+                # ValueError is a response body that is not JSON
+                stats.record_exception(time.monotonic() - started, exception)
+                if attempt >= MAX_RETRIES:
+                    # Count the request once, not every attempt of it
+                    self._circuit_breaker.record_failure()
+                    raise
+                _LOGGER.debug("Request to %s failed: %s, retrying", url, exception)
+            else:
+                stats.record_response(
+                    time.monotonic() - started, len(body), response.get("errcode")
+                )
+                self._circuit_breaker.record_success()
+                error = TTLockError(response.get("errcode"))
+                if not error.retryable or attempt >= MAX_RETRIES:
+                    return response
+                _LOGGER.debug(
+                    "Request to %s returned errcode %s, retrying",
+                    url,
+                    response["errcode"],
+                )
+
+            stats.retries += 1
+            await asyncio.sleep(_retry_delay(attempt))
+            attempt += 1
+
+    async def _send_request(
+        self, method: str, url: str, data: dict, headers: dict
+    ) -> bytes:
+        """Send single request to the API, return response body."""
         async with async_timeout.timeout(TIMEOUT):
             if method == "get":
                 url = url + "?" + urlencode(data)
                 response = await self._session.get(url, headers=headers)
 
-                return await response.json()
-
             elif method == "put":
                 response = await self._session.put(url, headers=headers, json=data)
-                return await response.json()
 
             elif method == "patch":
                 response = await self._session.patch(url, headers=headers, json=data)
-                return await response.json()
 
             elif method == "post":
                 if headers["Content-Type"] == "application/x-www-form-urlencoded":
                     response = await self._session.post(url, headers=headers, data=data)
                 else:
                     response = await self._session.post(url, headers=headers, json=data)
-                return await response.json()
 
-    async def list_lock(self):
-        """This API will return all the locks  related to a gateway."""
+            if response.status >= 500:
+                response.raise_for_status()
+
+            return await response.read()
+
+    async def _iter_pages(self, url: str, params: dict, page_size: int):
+        """Yield list items page by page while the next page is prefetched."""
         headers = {"Content-Type": "application/x-www-form-urlencoded"}
 
-        params = {"pageNo": 1, "pageSize": 1000, "date": int(time.time_ns() / 1000000)}
-        response = await self._auth_wrapper(
-            "get", "/v3/lock/list", data=params, headers=headers
+        async def fetch_page(page_no: int) -> dict:
+            data = dict(params)
+            data["pageNo"] = page_no
+            data["pageSize"] = page_size
+            data["date"] = int(time.time_ns() / 1000000)
+            response = await self._auth_wrapper("get", url, data=data, headers=headers)
+
+            if "errcode" in response and response["errcode"] != 0:
+                raise TTLockError(response["errcode"], response["errmsg"])
+
+            return response
+
+        page_no = 1
+        next_page = asyncio.ensure_future(fetch_page(page_no))
+        try:
+            while next_page is not None:
+                response = await next_page
+                next_page = None
+
+                if "pages" in response:
+                    has_more = page_no < response["pages"]
+                else:
+                    has_more = len(response["list"]) >= page_size
+                if has_more:
+                    page_no += 1
+                    next_page = asyncio.ensure_future(fetch_page(page_no))
+
+                for item in response["list"]:
+                    yield item
+        finally:
+            # Consumer stopped early, drop the prefetched page
+            if next_page is not None and not next_page.cancel():
+                # Already finished, retrieve a possible exception
+                next_page.exception()
+
+    def iter_locks(self, page_size: int = LOCK_PAGE_SIZE):
+        """Iterate over all locks of the account."""
+        return self._iter_pages("/v3/lock/list", {}, page_size)
+
+    def iter_gateways(self, page_size: int = GATEWAY_PAGE_SIZE):
+        """Iterate over all gateways of the account."""
+        return self._iter_pages("/v3/gateway/list", {}, page_size)
+
+    def iter_lock_records(
+        self, lock_id, since: int = None, page_size: int = RECORD_PAGE_SIZE
+    ):
+        """Iterate over records of a lock, optionally only those after since."""
+        return self._iter_pages(
+            "/v3/lockRecord/list", self._record_params(lock_id, since), page_size
         )
 
-        if "errcode" in response and response["errcode"] != 0:
-            raise TTLockError(response["errcode"], response["errmsg"])
+    def iter_account_records(
+        self, since: int = None, page_size: int = RECORD_PAGE_SIZE
+    ):
+        """Iterate over records of all locks of the account."""
+        return self._iter_pages(
+            "/v3/lockRecord/list", self._record_params(None, since), page_size
+        )
 
-        return response["list"]
+    @staticmethod
+    def _record_params(lock_id, since: int = None) -> dict:
+        """Build record list filter parameters."""
+        params = {}
+        if lock_id is not None:
+            params["lockId"] = lock_id
+        if since is not None:
+            params["startDate"] = since
+            params["endDate"] = int(time.time_ns() / 1000000)
+        return params
 
-    async def query_open_state(self, lock_id):
-        """Get the open state of a lock via gateway or WiFi lock."""
+    async def list_lock(self):
+        """This API will return all the locks  related to a gateway."""
+        return [lock async for lock in self.iter_locks()]
+
+    async def list_gateway_locks(self, gateway_id):
+        """Get the locks a gateway relays commands to."""
         headers = {"Content-Type": "application/x-www-form-urlencoded"}
 
-        params = {"lockId": lock_id, "date": int(time.time_ns() / 1000000)}
+        params = {"gatewayId": gateway_id, "date": int(time.time_ns() / 1000000)}
         response = await self._auth_wrapper(
-            "get", "/v3/lock/queryOpenState", data=params, headers=headers
+            "get", "/v3/gateway/listLock", data=params, headers=headers
         )
 
         if "errcode" in response and response["errcode"] != 0:
             raise TTLockError(response["errcode"], response["errmsg"])
 
-        return response
+        return response["list"]
 
-    async def list_lock_record(self, lock_id):
+    async def query_open_state(self, lock_id, priority: int = PRIORITY_POLL):
         """Get the open state of a lock via gateway or WiFi lock."""
         headers = {"Content-Type": "application/x-www-form-urlencoded"}
 
-        params = {
-            "lockId": lock_id,
-            "date": int(time.time_ns() / 1000000),
-            "pageSize": 100,
-            "pageNo": 1,
-        }
+        params = {"lockId": lock_id, "date": int(time.time_ns() / 1000000)}
         response = await self._auth_wrapper(
-            "get", "/v3/lockRecord/list", data=params, headers=headers
+            "get",
+            "/v3/lock/queryOpenState",
+            data=params,
+            headers=headers,
+            priority=priority,
         )
 
         if "errcode" in response and response["errcode"] != 0:
             raise TTLockError(response["errcode"], response["errmsg"])
 
-        return response["list"]
+        return response
+
+    async def list_lock_record(self, lock_id, start_date: int = None):
+        """Get the records of a lock, optionally only those after start_date."""
+        return [rec async for rec in self.iter_lock_records(lock_id, start_date)]
 
     async def lock_lock(
         self,
@@ -187,7 +410,11 @@ class TTLockApiClient:
 
         data = {"lockId": lock_id, "date": int(time.time_ns() / 1000000)}
         response = await self._auth_wrapper(
-            "post", "/v3/lock/lock", data=data, headers=headers
+            "post",
+            "/v3/lock/lock",
+            data=data,
+            headers=headers,
+            priority=PRIORITY_COMMAND,
         )
 
         if "errcode" in response and response["errcode"] != 0:
@@ -204,7 +431,11 @@ class TTLockApiClient:
 
         data = {"lockId": lock_id, "date": int(time.time_ns() / 1000000)}
         response = await self._auth_wrapper(
-            "post", "/v3/lock/unlock", data=data, headers=headers
+            "post",
+            "/v3/lock/unlock",
+            data=data,
+            headers=headers,
+            priority=PRIORITY_COMMAND,
         )
 
         if "errcode" in response and response["errcode"] != 0:
@@ -213,6 +444,12 @@ class TTLockApiClient:
         return response
 
 
+def _retry_delay(attempt: int) -> float:
+    """Exponential backoff delay with jitter."""
+    delay = min(RETRY_BACKOFF_MAX, RETRY_BACKOFF * 2**attempt)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
 class TTLockError(Exception):
     """Represents TTLock API error"""
 
@@ -220,3 +457,16 @@ class TTLockError(Exception):
         self.code = code
         self.message = message
         super().__init__(self.message)
+
+    @property
+    def retryable(self) -> bool:
+        """Return true when error is temporary."""
+        return self.code in RETRYABLE_ERRCODES
+
+
+class TTLockCircuitOpenError(Exception):
+    """Represents blocked request to unavailable TTLock API"""
+
+    def __init__(self, server_url):
+        self.server_url = server_url
+        super().__init__(f"TTLock API at {server_url} is unavailable")
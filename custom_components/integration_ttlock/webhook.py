@@ -0,0 +1,92 @@
+"""Webhook callback processing for TTLock."""
+import asyncio
+import logging
+from urllib.parse import parse_qs
+
+from homeassistant.core import HomeAssistant
+
+from .json_utils import json_loads
+from .ttlock import record_key
+
+WEBHOOK_QUEUE_SIZE = 1000
+WEBHOOK_BATCH_SIZE = 100
+# Wait for more callbacks of the same burst before processing
+WEBHOOK_BATCH_DELAY = 0.5
+
+_LOGGER: logging.Logger = logging.getLogger(__package__)
+
+
+class TTLockWebhookQueue:
+    """Queues webhook callbacks and applies them in micro batches"""
+
+    def __init__(self, hass: HomeAssistant, coordinator) -> None:
+        """Initialize."""
+        self._hass = hass
+        self._coordinator = coordinator
+        self._queue = asyncio.Queue(WEBHOOK_QUEUE_SIZE)
+        self._task = None
+
+    def start(self) -> None:
+        """Start processing queued callbacks."""
+        self._task = self._hass.async_create_background_task(
+            self._async_worker(), "integration_ttlock webhook worker"
+        )
+
+    def stop(self) -> None:
+        """Stop processing queued callbacks."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def enqueue(self, body: str) -> bool:
+        """Queue callback body, return false when queue is full."""
+        try:
+            self._queue.put_nowait(body)
+        except asyncio.QueueFull:
+            _LOGGER.warning("Webhook queue is full, dropping callback")
+            return False
+        return True
+
+    async def _async_worker(self) -> None:
+        """Drain the queue in micro batches."""
+        while True:
+            batch = [await self._queue.get()]
+            await asyncio.sleep(WEBHOOK_BATCH_DELAY)
+            while len(batch) < WEBHOOK_BATCH_SIZE and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            try:
+                self._process_batch(batch)
+            except Exception:  # pylint: disable=broad-except
+                _LOGGER.exception("Failed to process webhook callbacks")
+
+    def _process_batch(self, bodies: list) -> None:
+        """Apply records of the batch, each record once."""
+        records = {}
+        for body in bodies:
+            try:
+                body_records = {
+                    record_key(rec): rec for rec in parse_webhook_records(body)
+                }
+            except (AttributeError, KeyError, TypeError, ValueError) as exception:
+                # Skip only this callback, the others of the batch are fine
+                _LOGGER.warning("Ignoring invalid webhook callback: %r", exception)
+                continue
+
+            for key, rec in body_records.items():
+                # Retried callbacks repeat the same records
+                records.setdefault(key, rec)
+
+        self._coordinator.async_push_records(list(records.values()))
+
+
+def parse_webhook_records(body: str) -> list:
+    """Parse records from webhook callback body."""
+    data = parse_qs(body)
+    lock_id = int(data["lockId"][0])
+
+    records = json_loads(data["records"][0])
+    for rec in records:
+        rec.setdefault("lockId", lock_id)
+
+    return records
@@ -14,9 +14,26 @@
 #
 # See here for more info: https://docs.pytest.org/en/latest/fixture.html (note that
 # pytest includes fixtures OOB which you can use as defined on this page)
+import time
 from unittest.mock import patch
 
+import aiohttp
 import pytest
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.integration_ttlock.const import (
+    CONF_ACCESS_TOKEN,
+    CONF_ACCESS_TOKEN_EXPIRES_AT,
+    CONF_CLIENT_ID,
+    CONF_CLIENT_SECRET,
+    CONF_REFRESH_TOKEN,
+    CONF_SERVER,
+    CONF_USERNAME,
+    DOMAIN,
+)
+from custom_components.integration_ttlock.ttlock_api import TTLockApiClient
+
+from .fake_ttlock import FakeTTLockCloud
 
 pytest_plugins = "pytest_homeassistant_custom_component"
 
@@ -61,3 +78,51 @@ def error_get_data_fixture():
         side_effect=Exception,
     ):
         yield
+
+
+# Local stand-in for the TTLock cloud, tune latency, throttling and tokens through
+# the returned FakeTTLockCloud while the test runs.
+@pytest.fixture(name="ttlock_cloud")
+async def ttlock_cloud_fixture(socket_enabled, aiohttp_server):
+    """Start fake TTLock cloud on localhost."""
+    cloud = FakeTTLockCloud()
+    server = await aiohttp_server(cloud.make_app())
+    cloud.url = str(server.make_url("/"))
+    return cloud
+
+
+@pytest.fixture(name="ttlock_client")
+async def ttlock_client_fixture(ttlock_cloud):
+    """Return API client logged in to the fake TTLock cloud."""
+    async with aiohttp.ClientSession() as session:
+        client = TTLockApiClient(
+            ttlock_cloud.url, "client_id", "client_secret", "test_username", session
+        )
+        tokens = ttlock_cloud.issue_tokens()
+        client.set_tokens(
+            tokens["access_token"],
+            time.time() + tokens["expires_in"],
+            tokens["refresh_token"],
+        )
+        yield client
+
+
+@pytest.fixture(name="ttlock_entry")
+def ttlock_entry_fixture(hass, tmp_path, ttlock_cloud):
+    """Return config entry logged in to the fake TTLock cloud."""
+    hass.config.config_dir = str(tmp_path)
+    tokens = ttlock_cloud.issue_tokens()
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={
+            CONF_SERVER: ttlock_cloud.url,
+            CONF_CLIENT_ID: "client_id",
+            CONF_CLIENT_SECRET: "client_secret",
+            CONF_USERNAME: "test_username",
+            CONF_ACCESS_TOKEN: tokens["access_token"],
+            CONF_ACCESS_TOKEN_EXPIRES_AT: time.time() + tokens["expires_in"],
+            CONF_REFRESH_TOKEN: tokens["refresh_token"],
+        },
+    )
+    entry.add_to_hass(hass)
+    return entry
@@ -0,0 +1,293 @@
+"""Fake TTLock cloud API for offline tests and benchmarks."""
+import asyncio
+import itertools
+import time
+from collections import Counter
+
+from aiohttp import web
+
+ERRCODE_INVALID_TOKEN = 10003
+ERRCODE_BUSY = -3003
+ERRCODE_NO_LOCK = -1003
+ERRCODE_NO_GATEWAY = -2012
+
+FIRST_LOCK_DATE = 1700000000000
+
+
+class FakeTTLockCloud:
+    """In memory stand-in for the TTLock cloud endpoints used by the client"""
+
+    def __init__(
+        self,
+        latency: float = 0,
+        token_lifetime: int = 7776000,
+        max_requests_per_second: int = None,
+    ) -> None:
+        """Initialize."""
+        self.url = None
+        self.latency = latency
+        self.token_lifetime = token_lifetime
+        self.max_requests_per_second = max_requests_per_second
+        self.locks = {}
+        self.states = {}
+        self.records = {}
+        self.gateways = {}
+        # Seconds a gateway is busy relaying a query to a lock over BLE
+        self.gateway_latency = 0
+        self.gateway_busy = 0
+        self._busy_gateways = set()
+        self._gateway_ids = itertools.count(1)
+        # Locks accepting commands without changing state
+        self.jammed = set()
+        self.requests = Counter()
+        self.throttled = 0
+        # Number of next requests answered with an internal server error
+        self.server_errors = 0
+        self._access_tokens = {}
+        self._refresh_tokens = set()
+        self._token_ids = itertools.count(1)
+        self._record_ids = itertools.count(1)
+        self._window_start = 0
+        self._window_requests = 0
+
+    def make_app(self) -> web.Application:
+        """Return aiohttp application serving the fake endpoints."""
+        app = web.Application(middlewares=[self._middleware])
+        app.router.add_post("/oauth2/token", self._token)
+        app.router.add_get("/v3/lock/list", self._lock_list)
+        app.router.add_get("/v3/lock/queryOpenState", self._query_open_state)
+        app.router.add_get("/v3/gateway/list", self._gateway_list)
+        app.router.add_get("/v3/gateway/listLock", self._gateway_lock_list)
+        app.router.add_get("/v3/lockRecord/list", self._record_list)
+        app.router.add_post("/v3/lock/lock", self._lock)
+        app.router.add_post("/v3/lock/unlock", self._unlock)
+        return app
+
+    def add_locks(
+        self, count: int, records_per_lock: int = 0, has_gateway: bool = True
+    ) -> list:
+        """Add locks, each with records_per_lock unlock and lock records."""
+        first = len(self.locks) + 1
+        for lock_id in range(first, first + count):
+            self.locks[lock_id] = {
+                "lockId": lock_id,
+                "lockName": f"M201_{lock_id:06x}",
+                "lockAlias": f"Lock {lock_id}",
+                "lockMac": f"00:00:00:{lock_id >> 16:02x}:"
+                f"{lock_id >> 8 & 255:02x}:{lock_id & 255:02x}",
+                "electricQuantity": 90,
+                "hasGateway": int(has_gateway),
+            }
+            self.states[lock_id] = 0
+            self.records[lock_id] = []
+            for index in range(records_per_lock):
+                # Alternate between app unlock and app lock
+                self.add_record(
+                    lock_id, 1 if index % 2 == 0 else 11, FIRST_LOCK_DATE + index
+                )
+
+        return list(range(first, first + count))
+
+    def add_gateway(self, lock_ids: list) -> int:
+        """Add a gateway relaying commands to the locks."""
+        gateway_id = next(self._gateway_ids)
+        self.gateways[gateway_id] = list(lock_ids)
+        return gateway_id
+
+    def add_record(
+        self,
+        lock_id,
+        record_type: int,
+        lock_date: int = None,
+        username="user",
+        success: int = 1,
+    ) -> dict:
+        """Add a record to a lock, records are kept newest first."""
+        if lock_date is None:
+            lock_date = int(time.time() * 1000)
+
+        record = {
+            "recordId": next(self._record_ids),
+            "lockId": lock_id,
+            "recordTypeFromLock": record_type,
+            "recordType": record_type,
+            "success": success,
+            "username": username,
+            "keyboardPwd": "",
+            "lockDate": lock_date,
+            "serverDate": lock_date,
+            "electricQuantity": self.locks[lock_id]["electricQuantity"],
+        }
+        self.records[lock_id].insert(0, record)
+        return record
+
+    def issue_tokens(self) -> dict:
+        """Issue new tokens like a successful login."""
+        token_id = next(self._token_ids)
+        access_token = f"access_{token_id}"
+        refresh_token = f"refresh_{token_id}"
+        self._access_tokens[access_token] = time.time() + self.token_lifetime
+        self._refresh_tokens.add(refresh_token)
+        return {
+            "access_token": access_token,
+            "refresh_token": refresh_token,
+            "uid": 1,
+            "expires_in": self.token_lifetime,
+        }
+
+    def expire_tokens(self) -> None:
+        """Invalidate all access tokens, refresh tokens stay valid."""
+        self._access_tokens.clear()
+
+    def _throttle(self) -> bool:
+        """Return true when request exceeds allowed requests per second."""
+        if self.max_requests_per_second is None:
+            return False
+
+        now = time.monotonic()
+        if now - self._window_start >= 1:
+            self._window_start = now
+            self._window_requests = 0
+
+        self._window_requests += 1
+        return self._window_requests > self.max_requests_per_second
+
+    @web.middleware
+    async def _middleware(self, request: web.Request, handler) -> web.Response:
+        self.requests[request.path] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        if request.method == "GET":
+            params = request.query
+        else:
+            params = await request.post()
+
+        if self.server_errors:
+            self.server_errors -= 1
+            return web.Response(status=500)
+
+        if self._throttle():
+            self.throttled += 1
+            return _error(ERRCODE_BUSY, "Gateway is busy")
+
+        if request.path != "/oauth2/token":
+            expires_at = self._access_tokens.get(params.get("accessToken"))
+            if expires_at is None or expires_at < time.time():
+                return _error(ERRCODE_INVALID_TOKEN, "invalid token")
+
+        request["params"] = params
+        return await handler(request)
+
+    async def _token(self, request: web.Request) -> web.Response:
+        params = request["params"]
+        if params.get("grant_type") == "refresh_token":
+            refresh_token = params.get("refresh_token")
+            if refresh_token not in self._refresh_tokens:
+                return _error(10004, "invalid grant")
+            # Refresh tokens are single use
+            self._refresh_tokens.discard(refresh_token)
+        elif not params.get("password"):
+            return _error(10007, "invalid account or invalid password")
+
+        return web.json_response(self.issue_tokens())
+
+    async def _lock_list(self, request: web.Request) -> web.Response:
+        params = request["params"]
+        return web.json_response(_page(list(self.locks.values()), params))
+
+    async def _query_open_state(self, request: web.Request) -> web.Response:
+        params = request["params"]
+        lock_id = int(params["lockId"])
+        if lock_id not in self.states:
+            return _error(ERRCODE_NO_LOCK, "lock does not exist")
+        if not self.locks[lock_id]["hasGateway"]:
+            return _error(ERRCODE_NO_GATEWAY, "lock is not connected to any gateway")
+
+        # A gateway relays one query at a time
+        gateway_id = self._gateway_of(lock_id)
+        if gateway_id in self._busy_gateways:
+            self.gateway_busy += 1
+            return _error(ERRCODE_BUSY, "Gateway is busy")
+        if self.gateway_latency:
+            self._busy_gateways.add(gateway_id)
+            try:
+                await asyncio.sleep(self.gateway_latency)
+            finally:
+                self._busy_gateways.discard(gateway_id)
+
+        return web.json_response({"state": self.states[lock_id]})
+
+    async def _gateway_list(self, request: web.Request) -> web.Response:
+        params = request["params"]
+        gateways = [
+            {"gatewayId": gateway_id, "lockNum": len(lock_ids), "isOnline": 1}
+            for gateway_id, lock_ids in self.gateways.items()
+        ]
+        return web.json_response(_page(gateways, params))
+
+    async def _gateway_lock_list(self, request: web.Request) -> web.Response:
+        params = request["params"]
+        lock_ids = self.gateways.get(int(params["gatewayId"]), [])
+        return web.json_response(
+            {"list": [{"lockId": lock_id, "rssi": -60} for lock_id in lock_ids]}
+        )
+
+    async def _record_list(self, request: web.Request) -> web.Response:
+        params = request["params"]
+        if "lockId" in params:
+            records = self.records.get(int(params["lockId"]), [])
+        else:
+            records = sorted(
+                itertools.chain.from_iterable(self.records.values()),
+                key=lambda rec: rec["lockDate"],
+                reverse=True,
+            )
+
+        if "startDate" in params:
+            start = int(params["startDate"])
+            end = int(params["endDate"])
+            records = [rec for rec in records if start <= rec["lockDate"] <= end]
+
+        return web.json_response(_page(records, params))
+
+    async def _lock(self, request: web.Request) -> web.Response:
+        params = request["params"]
+        return self._command(int(params["lockId"]), 0, 11)
+
+    async def _unlock(self, request: web.Request) -> web.Response:
+        params = request["params"]
+        return self._command(int(params["lockId"]), 1, 12)
+
+    def _gateway_of(self, lock_id):
+        """Return gateway relaying commands to a lock, locks default to their own."""
+        for gateway_id, lock_ids in self.gateways.items():
+            if lock_id in lock_ids:
+                return gateway_id
+        return ("lock", lock_id)
+
+    def _command(self, lock_id, state: int, record_type: int) -> web.Response:
+        if lock_id not in self.states:
+            return _error(ERRCODE_NO_LOCK, "lock does not exist")
+        if lock_id not in self.jammed:
+            self.states[lock_id] = state
+            self.add_record(lock_id, record_type)
+        return _error(0, "none")
+
+
+def _page(items: list, params) -> dict:
+    """Return one page of items like TTLock list endpoints."""
+    page_no = int(params.get("pageNo", 1))
+    page_size = int(params.get("pageSize", 20))
+    start = (page_no - 1) * page_size
+    return {
+        "list": items[start : start + page_size],
+        "pageNo": page_no,
+        "pageSize": page_size,
+        "pages": max(1, -(-len(items) // page_size)),
+        "total": len(items),
+    }
+
+
+def _error(errcode: int, errmsg: str) -> web.Response:
+    return web.json_response({"errcode": errcode, "errmsg": errmsg})
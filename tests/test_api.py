@@ -1,86 +1,106 @@
-"""Tests for integration_blueprint api."""
+"""Tests for integration_ttlock api."""
 import asyncio
+from unittest.mock import patch
 
-import aiohttp
-from homeassistant.helpers.aiohttp_client import async_get_clientsession
+import pytest
 
-from custom_components.integration_blueprint.api import IntegrationBlueprintApiClient
+from custom_components.integration_ttlock.ttlock_api import TTLockError
 
 
-async def test_api(hass, aioclient_mock, caplog):
-    """Test API calls."""
+async def test_list_locks_pages(ttlock_cloud, ttlock_client):
+    """Test locks of all pages are listed."""
+    ttlock_cloud.add_locks(25)
 
-    # To test the api submodule, we first create an instance of our API client
-    api = IntegrationBlueprintApiClient("test", "test", async_get_clientsession(hass))
+    locks = [lock async for lock in ttlock_client.iter_locks(page_size=10)]
 
-    # Use aioclient_mock which is provided by `pytest_homeassistant_custom_components`
-    # to mock responses to aiohttp requests. In this case we are telling the mock to
-    # return {"test": "test"} when a `GET` call is made to the specified URL. We then
-    # call `async_get_data` which will make that `GET` request.
-    aioclient_mock.get(
-        "https://jsonplaceholder.typicode.com/posts/1", json={"test": "test"}
-    )
-    assert await api.async_get_data() == {"test": "test"}
-
-    # We do the same for `async_set_title`. Note the difference in the mock call
-    # between the previous step and this one. We use `patch` here instead of `get`
-    # because we know that `async_set_title` calls `api_wrapper` with `patch` as the
-    # first parameter
-    aioclient_mock.patch("https://jsonplaceholder.typicode.com/posts/1")
-    assert await api.async_set_title("test") is None
-
-    # In order to get 100% coverage, we need to test `api_wrapper` to test the code
-    # that isn't already called by `async_get_data` and `async_set_title`. Because the
-    # only logic that lives inside `api_wrapper` that is not being handled by a third
-    # party library (aiohttp) is the exception handling, we also want to simulate
-    # raising the exceptions to ensure that the function handles them as expected.
-    # The caplog fixture allows access to log messages in tests. This is particularly
-    # useful during exception handling testing since often the only action as part of
-    # exception handling is a logging statement
-    caplog.clear()
-    aioclient_mock.put(
-        "https://jsonplaceholder.typicode.com/posts/1", exc=asyncio.TimeoutError
-    )
-    assert (
-        await api.api_wrapper("put", "https://jsonplaceholder.typicode.com/posts/1")
-        is None
-    )
-    assert (
-        len(caplog.record_tuples) == 1
-        and "Timeout error fetching information from" in caplog.record_tuples[0][2]
-    )
+    assert [lock["lockId"] for lock in locks] == list(range(1, 26))
+    assert ttlock_cloud.requests["/v3/lock/list"] == 3
 
-    caplog.clear()
-    aioclient_mock.post(
-        "https://jsonplaceholder.typicode.com/posts/1", exc=aiohttp.ClientError
-    )
-    assert (
-        await api.api_wrapper("post", "https://jsonplaceholder.typicode.com/posts/1")
-        is None
-    )
-    assert (
-        len(caplog.record_tuples) == 1
-        and "Error fetching information from" in caplog.record_tuples[0][2]
-    )
 
-    caplog.clear()
-    aioclient_mock.post("https://jsonplaceholder.typicode.com/posts/2", exc=Exception)
-    assert (
-        await api.api_wrapper("post", "https://jsonplaceholder.typicode.com/posts/2")
-        is None
-    )
-    assert (
-        len(caplog.record_tuples) == 1
-        and "Something really wrong happened!" in caplog.record_tuples[0][2]
-    )
+async def test_lock_records_since(ttlock_cloud, ttlock_client):
+    """Test only records after since are returned, newest first."""
+    ttlock_cloud.add_locks(1, records_per_lock=30)
+    newest = ttlock_cloud.records[1][0]["lockDate"]
 
-    caplog.clear()
-    aioclient_mock.post("https://jsonplaceholder.typicode.com/posts/3", exc=TypeError)
-    assert (
-        await api.api_wrapper("post", "https://jsonplaceholder.typicode.com/posts/3")
-        is None
-    )
-    assert (
-        len(caplog.record_tuples) == 1
-        and "Error parsing information from" in caplog.record_tuples[0][2]
+    records = await ttlock_client.list_lock_record(1, newest - 4)
+
+    assert [rec["lockDate"] for rec in records] == list(range(newest, newest - 5, -1))
+
+
+async def test_lock_unlock(ttlock_cloud, ttlock_client):
+    """Test commands change lock state."""
+    ttlock_cloud.add_locks(1)
+
+    await ttlock_client.lock_unlock(1)
+    assert (await ttlock_client.query_open_state(1))["state"] == 1
+
+    await ttlock_client.lock_lock(1)
+    assert (await ttlock_client.query_open_state(1))["state"] == 0
+
+
+async def test_query_unknown_lock(ttlock_cloud, ttlock_client):
+    """Test API errors are raised."""
+    with pytest.raises(TTLockError):
+        await ttlock_client.query_open_state(1)
+
+
+async def test_invalid_token_refreshed_once(ttlock_cloud, ttlock_client):
+    """Test concurrent requests with an invalid token share a single refresh."""
+    ttlock_cloud.add_locks(5)
+    ttlock_cloud.expire_tokens()
+
+    new_tokens = []
+    ttlock_client.on_new_token(lambda *tokens: new_tokens.append(tokens))
+    states = await asyncio.gather(
+        *(ttlock_client.query_open_state(lock_id) for lock_id in range(1, 6))
     )
+
+    assert [state["state"] for state in states] == [0] * 5
+
+    assert ttlock_cloud.requests["/oauth2/token"] == 1
+    assert len(new_tokens) == 1
+
+
+async def test_expiring_token_refreshed_before_request(ttlock_cloud, ttlock_client):
+    """Test token close to expiry is refreshed without a failed request."""
+    ttlock_cloud.add_locks(1)
+    ttlock_client.set_tokens(None, None, ttlock_cloud.issue_tokens()["refresh_token"])
+
+    await ttlock_client.query_open_state(1)
+
+    assert ttlock_cloud.requests["/oauth2/token"] == 1
+    assert ttlock_cloud.requests["/v3/lock/queryOpenState"] == 1
+
+
+async def test_throttled_request_retried(ttlock_cloud, ttlock_client):
+    """Test requests rejected as busy are retried."""
+    ttlock_cloud.add_locks(1)
+    ttlock_cloud.max_requests_per_second = 1
+
+    with patch(
+        "custom_components.integration_ttlock.ttlock_api._retry_delay",
+        return_value=0.5,
+    ):
+        for _ in range(2):
+            assert (await ttlock_client.query_open_state(1))["state"] == 0
+
+    assert ttlock_cloud.throttled >= 1
+
+
+async def test_telemetry_per_endpoint(ttlock_cloud, ttlock_client):
+    """Test requests, retries, errcodes and bytes are counted per endpoint."""
+    ttlock_cloud.add_locks(3)
+    ttlock_cloud.expire_tokens()
+
+    await ttlock_client.list_lock()
+    await ttlock_client.lock_unlock(1)
+
+    telemetry = ttlock_client.telemetry.as_dict()
+    assert telemetry["/v3/lock/list"]["requests"] == 2
+    assert telemetry["/v3/lock/list"]["errcodes"] == {"10003": 1}
+    assert telemetry["/v3/lock/list"]["bytes_received"] > 0
+    assert telemetry["/v3/lock/unlock"]["errcodes"] == {"0": 1}
+    assert telemetry["/oauth2/token"]["requests"] == 1
+    assert telemetry["/v3/lock/list"]["latency_ms"]["p99"] is not None
+    assert ttlock_client.telemetry.requests == 4
+    assert ttlock_client.telemetry.retries == 0
@@ -0,0 +1,173 @@
+"""Benchmarks for integration_ttlock against the fake TTLock cloud."""
+import asyncio
+import json
+import tracemalloc
+
+import pytest
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.integration_ttlock import TTLockDataUpdateCoordinator
+from custom_components.integration_ttlock.const import (
+    CONF_REFRESH_TYPE,
+    DOMAIN,
+    REFRESH_POLLING,
+    REFRESH_POLLING_LOGS,
+)
+from custom_components.integration_ttlock.json_utils import json_loads
+from custom_components.integration_ttlock.ttlock import (
+    extract_lock_status_from_records,
+    group_records_by_lock_id,
+    project_record,
+)
+
+from .fake_ttlock import FIRST_LOCK_DATE, FakeTTLockCloud
+
+LOCK_COUNT = 200
+
+
+def _per_second(benchmark, count: int) -> None:
+    """Report operations per second of a benchmarked batch of count operations."""
+    # Benchmarks run once without statistics under --benchmark-disable
+    if benchmark.stats is not None:
+        benchmark.extra_info["per_second"] = count / benchmark.stats.stats.mean
+
+
+def test_query_open_state_throughput(
+    event_loop, benchmark, ttlock_cloud, ttlock_client
+):
+    """Measure open state requests per second through the client."""
+    ttlock_cloud.add_locks(LOCK_COUNT)
+
+    async def query_all():
+        await asyncio.gather(
+            *(ttlock_client.query_open_state(lock_id) for lock_id in ttlock_cloud.locks)
+        )
+
+    benchmark.pedantic(
+        lambda: event_loop.run_until_complete(query_all()), rounds=10, warmup_rounds=1
+    )
+    _per_second(benchmark, LOCK_COUNT)
+
+
+def test_record_pages_throughput(event_loop, benchmark, ttlock_cloud, ttlock_client):
+    """Measure records per second listed page by page."""
+    ttlock_cloud.add_locks(1, records_per_lock=2000)
+
+    async def list_records():
+        return await ttlock_client.list_lock_record(1)
+
+    records = benchmark.pedantic(
+        lambda: event_loop.run_until_complete(list_records()), rounds=10
+    )
+    assert len(records) == 2000
+    _per_second(benchmark, len(records))
+
+
+@pytest.mark.parametrize("expected_lingering_timers", [True])
+@pytest.mark.parametrize("refresh_type", [REFRESH_POLLING, REFRESH_POLLING_LOGS])
+def test_coordinator_cycle(
+    hass, tmp_path, event_loop, benchmark, ttlock_cloud, ttlock_client, refresh_type
+):
+    """Measure a full coordinator refresh of all locks."""
+    ttlock_cloud.add_locks(LOCK_COUNT, records_per_lock=10)
+    hass.config.config_dir = str(tmp_path)
+    entry = MockConfigEntry(domain=DOMAIN, options={CONF_REFRESH_TYPE: refresh_type})
+    coordinator = TTLockDataUpdateCoordinator(hass, client=ttlock_client, entry=entry)
+    event_loop.run_until_complete(coordinator.history.async_setup())
+
+    def setup():
+        # Every lock is due and a new record arrived since the previous cycle
+        for lock_id in ttlock_cloud.locks:
+            coordinator.poll_scheduler.boost(lock_id)
+            ttlock_cloud.add_record(lock_id, 1)
+
+    benchmark.pedantic(
+        lambda: event_loop.run_until_complete(coordinator.async_refresh()),
+        setup=setup,
+        rounds=5,
+    )
+    event_loop.run_until_complete(coordinator.history.async_close())
+
+    assert coordinator.last_update_success
+    assert len(coordinator.data["states"]) == LOCK_COUNT
+    _per_second(benchmark, LOCK_COUNT)
+
+
+def test_record_extraction_throughput(benchmark):
+    """Measure records per second grouped and reduced to lock states."""
+    records = [
+        {
+            "recordId": record_id,
+            "lockId": record_id % LOCK_COUNT,
+            "recordType": 1 if record_id % 3 else 11,
+            "success": 1,
+            "username": "user",
+            "lockDate": FIRST_LOCK_DATE + record_id,
+        }
+        for record_id in range(100000)
+    ]
+
+    def extract():
+        return {
+            lock_id: extract_lock_status_from_records(lock_records)
+            for lock_id, lock_records in group_records_by_lock_id(records).items()
+        }
+
+    states = benchmark(extract)
+    assert len(states) == LOCK_COUNT
+    _per_second(benchmark, len(records))
+
+
+@pytest.mark.parametrize("loads", [json.loads, json_loads], ids=["stdlib", "fast"])
+def test_record_decode(benchmark, loads):
+    """Measure CPU and memory of decoding 1000 records."""
+    body = json.dumps({"list": _api_records(1000), "pages": 1}).encode()
+
+    tracemalloc.start()
+    records = loads(body)["list"]
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert len(records) == 1000
+
+    benchmark(lambda: loads(body))
+    benchmark.extra_info["retained_bytes_per_1000"] = retained
+    benchmark.extra_info["peak_bytes_per_1000"] = peak
+
+
+def test_record_projection(benchmark):
+    """Measure cost of projecting 1000 decoded records and the size it saves.
+
+    Projection runs after decoding and only on records kept until they are
+    stored in history, it trades CPU for smaller retained records and rows.
+    """
+    body = json.dumps(_api_records(1000)).encode()
+    memory = {}
+    for name, decode in (
+        ("full", lambda: json_loads(body)),
+        ("projected", lambda: [project_record(rec) for rec in json_loads(body)]),
+    ):
+        tracemalloc.start()
+        records = decode()
+        memory[name] = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del records
+
+    records = json_loads(body)
+    projected = benchmark(lambda: [project_record(rec) for rec in records])
+    benchmark.extra_info["retained_bytes_per_1000"] = {
+        name: retained for name, (retained, _) in memory.items()
+    }
+    benchmark.extra_info["peak_bytes_per_1000"] = {
+        name: peak for name, (_, peak) in memory.items()
+    }
+    benchmark.extra_info["history_bytes_per_1000"] = {
+        "full": sum(len(json.dumps(rec)) for rec in records),
+        "projected": sum(len(json.dumps(rec)) for rec in projected),
+    }
+
+
+def _api_records(count: int) -> list:
+    """Return records with all fields the record list endpoint returns."""
+    cloud = FakeTTLockCloud()
+    cloud.add_locks(1, records_per_lock=count)
+    return cloud.records[1]
@@ -0,0 +1,108 @@
+"""Tests for integration_ttlock circuit breaker and retries."""
+from unittest.mock import patch
+
+import aiohttp
+import pytest
+
+from custom_components.integration_ttlock.circuit_breaker import (
+    FAILURE_THRESHOLD,
+    RECOVERY_TIMEOUT,
+    STATE_CLOSED,
+    STATE_HALF_OPEN,
+    STATE_OPEN,
+    TTLockCircuitBreaker,
+)
+from custom_components.integration_ttlock.ttlock_api import (
+    MAX_RETRIES,
+    RETRY_BACKOFF,
+    RETRY_BACKOFF_MAX,
+    TTLockCircuitOpenError,
+    TTLockError,
+    _retry_delay,
+)
+
+MONOTONIC = "custom_components.integration_ttlock.circuit_breaker.time.monotonic"
+RETRY_DELAY = "custom_components.integration_ttlock.ttlock_api._retry_delay"
+
+
+def test_circuit_opens_and_recovers():
+    """Test circuit opens after repeated failures and a probe closes it."""
+    breaker = TTLockCircuitBreaker()
+    with patch(MONOTONIC, return_value=1000):
+        for _ in range(FAILURE_THRESHOLD - 1):
+            breaker.record_failure()
+        assert breaker.allow_request()
+        breaker.record_failure()
+        assert breaker.state == STATE_OPEN
+        assert not breaker.allow_request()
+
+    with patch(MONOTONIC, return_value=1000 + RECOVERY_TIMEOUT):
+        assert breaker.allow_request()
+        assert breaker.state == STATE_HALF_OPEN
+        # Only the probe is let through
+        assert not breaker.allow_request()
+        breaker.record_success()
+
+    assert breaker.state == STATE_CLOSED
+    assert breaker.allow_request()
+
+
+def test_failed_probe_reopens_circuit():
+    """Test circuit opens again at once when the probe fails."""
+    breaker = TTLockCircuitBreaker(failure_threshold=1)
+    with patch(MONOTONIC, return_value=1000):
+        breaker.record_failure()
+    with patch(MONOTONIC, return_value=1000 + RECOVERY_TIMEOUT):
+        assert breaker.allow_request()
+        breaker.record_failure()
+        assert breaker.state == STATE_OPEN
+        assert not breaker.allow_request()
+
+
+@pytest.mark.parametrize("attempt", range(8))
+def test_retry_delay(attempt):
+    """Test backoff doubles per attempt up to the maximum, with jitter."""
+    delay = min(RETRY_BACKOFF_MAX, RETRY_BACKOFF * 2**attempt)
+    with patch("random.uniform", side_effect=lambda low, high: low):
+        assert _retry_delay(attempt) == delay / 2
+    with patch("random.uniform", side_effect=lambda low, high: high):
+        assert _retry_delay(attempt) == delay
+
+
+async def test_failure_counted_once_per_request(ttlock_cloud, ttlock_client):
+    """Test a request failing on every retry counts as a single failure."""
+    ttlock_cloud.add_locks(1)
+    breaker = ttlock_client.circuit_breaker
+
+    with patch(RETRY_DELAY, return_value=0):
+        for _ in range(FAILURE_THRESHOLD - 1):
+            ttlock_cloud.server_errors = MAX_RETRIES + 1
+            with pytest.raises(aiohttp.ClientResponseError):
+                await ttlock_client.query_open_state(1)
+        assert ttlock_cloud.requests["/v3/lock/queryOpenState"] == (
+            FAILURE_THRESHOLD - 1
+        ) * (MAX_RETRIES + 1)
+        assert breaker.state == STATE_CLOSED
+
+        # A request succeeding on retry does not count
+        ttlock_cloud.server_errors = MAX_RETRIES
+        assert (await ttlock_client.query_open_state(1))["state"] == 0
+        assert breaker.state == STATE_CLOSED
+
+        for _ in range(FAILURE_THRESHOLD):
+            ttlock_cloud.server_errors = MAX_RETRIES + 1
+            with pytest.raises(aiohttp.ClientResponseError):
+                await ttlock_client.query_open_state(1)
+        assert breaker.state == STATE_OPEN
+        with pytest.raises(TTLockCircuitOpenError):
+            await ttlock_client.query_open_state(1)
+
+
+async def test_only_retryable_errcodes_retried(ttlock_client):
+    """Test errcodes are retried only when the error is temporary."""
+    assert TTLockError(-3003).retryable
+    assert not TTLockError(-1003).retryable
+
+    with patch(RETRY_DELAY, return_value=0), pytest.raises(TTLockError):
+        await ttlock_client.query_open_state(1)
+    assert ttlock_client.telemetry.retries == 0
@@ -0,0 +1,56 @@
+"""Tests for integration_ttlock client registry."""
+from custom_components.integration_ttlock.client_registry import (
+    async_get_client_registry,
+)
+from custom_components.integration_ttlock.const import DEFAULT_BULK_CONCURRENCY
+from custom_components.integration_ttlock.rate_limiter import TTLockRateLimiter
+
+
+async def test_clients_shared_per_account(hass):
+    """Test entries of one account share a client and all share a session."""
+    registry = async_get_client_registry(hass)
+    server = "https://euapi.ttlock.com"
+
+    client = registry.async_get_client(server, "client_id", "secret", "user")
+    same_client = registry.async_get_client(server, "client_id", "secret", "user")
+    other_client = registry.async_get_client(server, "client_id", "secret", "other")
+
+    assert same_client is client
+    assert other_client is not client
+    assert other_client._session is client._session
+    session = client._session
+    assert session.connector.limit_per_host >= DEFAULT_BULK_CONCURRENCY
+
+    await registry.async_release_client(client)
+    await registry.async_release_client(other_client)
+    assert not session.closed
+
+    await registry.async_release_client(same_client)
+    assert session.closed
+    new_client = registry.async_get_client(server, "client_id", "secret", "user")
+    assert new_client is not client
+    await registry.async_release_client(new_client)
+
+
+async def test_shared_client_rate_limit(hass, caplog):
+    """Test a different rate limit of an entry sharing a client is reported."""
+    registry = async_get_client_registry(hass)
+    server = "https://euapi.ttlock.com"
+    rate_limiter = TTLockRateLimiter(5, 10)
+
+    client = registry.async_get_client(
+        server, "client_id", "secret", "user", rate_limiter
+    )
+    same_client = registry.async_get_client(
+        server, "client_id", "secret", "user", TTLockRateLimiter(5, 10)
+    )
+    assert "Rate limit of user is ignored" not in caplog.text
+
+    other_limits = registry.async_get_client(
+        server, "client_id", "secret", "user", TTLockRateLimiter(1, 10)
+    )
+    assert "Rate limit of user is ignored" in caplog.text
+    assert other_limits.rate_limiter is rate_limiter
+
+    for shared_client in (client, same_client, other_limits):
+        await registry.async_release_client(shared_client)
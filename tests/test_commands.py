@@ -0,0 +1,88 @@
+"""Tests for integration_ttlock optimistic lock commands."""
+import asyncio
+from unittest.mock import patch
+
+import pytest
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.integration_ttlock import TTLockDataUpdateCoordinator
+from custom_components.integration_ttlock.commands import STATE_LOCKED, STATE_UNLOCKED
+from custom_components.integration_ttlock.const import DOMAIN
+from custom_components.integration_ttlock.ttlock_api import TTLockError
+
+
+@pytest.fixture(name="coordinator")
+async def coordinator_fixture(hass, ttlock_cloud, ttlock_client):
+    """Return coordinator with one locked lock, confirming without delay."""
+    ttlock_cloud.add_locks(1)
+    coordinator = TTLockDataUpdateCoordinator(
+        hass, client=ttlock_client, entry=MockConfigEntry(domain=DOMAIN)
+    )
+    coordinator.state_store.replace({1: {"state": 0, "state_changed_by": None}})
+    coordinator.data = {
+        "locks": ttlock_cloud.locks,
+        "states": coordinator.state_store.states,
+    }
+    with patch("custom_components.integration_ttlock.commands.CONFIRM_DELAYS", (0, 0)):
+        yield coordinator
+    coordinator.commands.async_cancel()
+
+
+async def _confirmed(coordinator):
+    while coordinator.commands.pending:
+        await asyncio.sleep(0.01)
+
+
+async def test_command_pending_until_confirmed(coordinator):
+    """Test command is pending once accepted and applied when confirmed."""
+    notified = []
+    coordinator.state_store.async_subscribe(1, notified.append)
+
+    await coordinator.commands.async_command(1, STATE_UNLOCKED)
+    assert coordinator.commands.pending == {1: STATE_UNLOCKED}
+
+    await _confirmed(coordinator)
+    assert coordinator.state_store.states[1]["state"] == STATE_UNLOCKED
+    assert notified == [{"pending"}, {"state"}]
+
+
+async def test_repeated_command_coalesced(coordinator, ttlock_cloud):
+    """Test double taps send a single command."""
+    await asyncio.gather(
+        coordinator.commands.async_command(1, STATE_UNLOCKED),
+        coordinator.commands.async_command(1, STATE_UNLOCKED),
+    )
+    await coordinator.commands.async_command(1, STATE_UNLOCKED)
+    await _confirmed(coordinator)
+
+    assert ttlock_cloud.requests["/v3/lock/unlock"] == 1
+
+
+async def test_opposite_commands_sent_in_order(coordinator, ttlock_cloud):
+    """Test opposite command waits for the one in flight."""
+    await asyncio.gather(
+        coordinator.commands.async_command(1, STATE_UNLOCKED),
+        coordinator.commands.async_command(1, STATE_LOCKED),
+    )
+    await _confirmed(coordinator)
+
+    assert ttlock_cloud.states[1] == STATE_LOCKED
+    assert coordinator.state_store.states[1]["state"] == STATE_LOCKED
+
+
+async def test_unconfirmed_command_rolled_back(coordinator, ttlock_cloud):
+    """Test state is kept when the lock does not report the commanded state."""
+    ttlock_cloud.jammed.add(1)
+
+    await coordinator.commands.async_command(1, STATE_UNLOCKED)
+    await _confirmed(coordinator)
+
+    assert coordinator.state_store.states[1]["state"] == STATE_LOCKED
+
+
+async def test_failed_command_rolled_back(coordinator):
+    """Test command errors are raised and nothing stays pending."""
+    with pytest.raises(TTLockError):
+        await coordinator.commands.async_command(2, STATE_UNLOCKED)
+
+    assert coordinator.commands.pending == {}
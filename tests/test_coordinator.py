@@ -0,0 +1,148 @@
+"""Tests for integration_ttlock coordinator polling."""
+import time
+from unittest.mock import patch
+
+import pytest
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.integration_ttlock import TTLockDataUpdateCoordinator
+from custom_components.integration_ttlock.const import (
+    CONF_REFRESH_TYPE,
+    DOMAIN,
+    EVENT_RECORD,
+    LOCKS_REFRESH_INTERVAL,
+    REFRESH_POLLING,
+    REFRESH_POLLING_ACCOUNT_LOGS,
+)
+from custom_components.integration_ttlock.ttlock import RECORD_FIELDS
+
+DAY = 86400000
+
+pytestmark = pytest.mark.parametrize("expected_lingering_timers", [True])
+
+
+@pytest.fixture(name="coordinator")
+async def coordinator_fixture(hass, tmp_path, ttlock_client):
+    """Return coordinator polling records of the whole account."""
+    hass.config.config_dir = str(tmp_path)
+    entry = MockConfigEntry(
+        domain=DOMAIN, options={CONF_REFRESH_TYPE: REFRESH_POLLING_ACCOUNT_LOGS}
+    )
+    coordinator = TTLockDataUpdateCoordinator(hass, client=ttlock_client, entry=entry)
+    await coordinator.history.async_setup()
+    yield coordinator
+    await coordinator.history.async_close()
+
+
+async def _refresh(hass, coordinator, lock_ids) -> list:
+    """Refresh the locks, return fired record events."""
+    events = []
+    remove = hass.bus.async_listen(EVENT_RECORD, events.append)
+    for lock_id in lock_ids:
+        coordinator.poll_scheduler.boost(lock_id)
+    await coordinator.async_refresh()
+    await hass.async_block_till_done()
+    remove()
+    assert coordinator.last_update_success
+    return events
+
+
+async def test_account_records_not_truncated(hass, ttlock_cloud, coordinator):
+    """Test every record after the marks is applied, however many arrived."""
+    ttlock_cloud.add_locks(2, records_per_lock=2)
+    await _refresh(hass, coordinator, ttlock_cloud.locks)
+
+    now = int(time.time() * 1000)
+    for offset in range(1500):
+        ttlock_cloud.add_record(1, 1 if offset % 2 else 11, now - 10000 + offset)
+    ttlock_cloud.add_record(2, 12, now - 20000)
+
+    events = await _refresh(hass, coordinator, ttlock_cloud.locks)
+    assert len(events) == 1501
+    records = await coordinator.history.async_last_records(1, limit=2000)
+    assert len(records) == 1502
+    # Only fields the integration reads are kept
+    assert all(tuple(rec) == RECORD_FIELDS for rec in records)
+    assert coordinator.data["states"][1]["state"] == 1
+    assert coordinator.data["states"][2]["state"] == 1
+
+
+async def test_account_records_lock_clock_behind(hass, ttlock_cloud, coordinator):
+    """Test records of a lock with a clock behind the others are not skipped."""
+    ttlock_cloud.add_locks(2)
+    now = int(time.time() * 1000)
+    # Clock of lock 1 is ten minutes behind
+    ttlock_cloud.add_record(1, 11, now - 10000 - 600000)
+    ttlock_cloud.add_record(2, 11, now - 10000)
+    await _refresh(hass, coordinator, ttlock_cloud.locks)
+
+    record = ttlock_cloud.add_record(1, 1, now - 600000)
+
+    events = await _refresh(hass, coordinator, ttlock_cloud.locks)
+    assert [event.data["record_id"] for event in events] == [record["recordId"]]
+    assert coordinator.data["states"][1]["state"] == 1
+
+
+async def test_account_records_idle_lock(hass, ttlock_cloud, coordinator):
+    """Test a long idle lock does not widen the fetched record window."""
+    ttlock_cloud.add_locks(2)
+    now = int(time.time() * 1000)
+    ttlock_cloud.add_record(1, 11, now - 90 * DAY)
+    for offset in range(300):
+        ttlock_cloud.add_record(2, 1 if offset % 2 else 11, now - offset * 240000)
+    await _refresh(hass, coordinator, ttlock_cloud.locks)
+
+    requests = []
+    for _ in range(3):
+        before = ttlock_cloud.requests["/v3/lockRecord/list"]
+        ttlock_cloud.add_record(2, 12)
+        events = await _refresh(hass, coordinator, ttlock_cloud.locks)
+        requests.append(ttlock_cloud.requests["/v3/lockRecord/list"] - before)
+        assert len(events) == 1
+
+    assert requests == [1, 1, 1]
+    assert coordinator.data["states"][1]["state"] == 0
+
+
+async def test_lock_list_refresh_interval(hass, ttlock_cloud, coordinator):
+    """Test lock list is refreshed on its own interval, not every poll."""
+    ttlock_cloud.add_locks(1)
+    await _refresh(hass, coordinator, ttlock_cloud.locks)
+    ttlock_cloud.add_locks(1)
+    await _refresh(hass, coordinator, ttlock_cloud.locks)
+    assert ttlock_cloud.requests["/v3/lock/list"] == 1
+    assert list(coordinator.data["locks"]) == [1]
+
+    # Refreshed well before the maximum poll interval
+    assert LOCKS_REFRESH_INTERVAL < coordinator.poll_scheduler.max_interval
+    coordinator._locks_updated_at -= LOCKS_REFRESH_INTERVAL
+    await _refresh(hass, coordinator, ttlock_cloud.locks)
+    assert ttlock_cloud.requests["/v3/lock/list"] == 2
+    assert list(coordinator.data["locks"]) == [1, 2]
+
+
+async def test_pushed_state_kept_during_refresh(
+    hass, tmp_path, ttlock_cloud, ttlock_client
+):
+    """Test a state pushed while a refresh runs is not reverted by the refresh."""
+    ttlock_cloud.add_locks(2)
+    hass.config.config_dir = str(tmp_path)
+    entry = MockConfigEntry(domain=DOMAIN, options={CONF_REFRESH_TYPE: REFRESH_POLLING})
+    coordinator = TTLockDataUpdateCoordinator(hass, client=ttlock_client, entry=entry)
+    await coordinator.history.async_setup()
+    await coordinator.async_refresh()
+    query_open_state = ttlock_client.query_open_state
+
+    async def push_while_querying(lock_id, **kwargs):
+        coordinator.async_push_states({1: {"state": 1, "state_changed_by": "user"}})
+        return await query_open_state(lock_id, **kwargs)
+
+    # Only lock 2 is due
+    coordinator.poll_scheduler.record_poll(1, False)
+    coordinator.poll_scheduler.boost(2)
+    with patch.object(ttlock_client, "query_open_state", push_while_querying):
+        await coordinator.async_refresh()
+    await coordinator.history.async_close()
+
+    assert coordinator.state_store.states[1]["state"] == 1
+    assert 1 not in coordinator.changed_fields
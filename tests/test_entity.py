@@ -0,0 +1,47 @@
+"""Tests for integration_ttlock entity state writes."""
+import pytest
+
+from custom_components.integration_ttlock.const import DOMAIN
+
+pytestmark = pytest.mark.parametrize("expected_lingering_timers", [True])
+
+
+async def test_only_changed_entities_written(hass, ttlock_cloud, ttlock_entry):
+    """Test refreshes write only entities whose relevant fields changed."""
+    ttlock_cloud.add_locks(2)
+    assert await hass.config_entries.async_setup(ttlock_entry.entry_id)
+    await hass.async_block_till_done()
+    coordinator = hass.data[DOMAIN][ttlock_entry.entry_id]
+    coordinator.entity_writes_performed = 0
+    coordinator.entity_writes_skipped = 0
+
+    async def refresh() -> None:
+        # Fetch lock list and states of all locks again
+        coordinator._locks_updated_at = None
+        for lock_id in ttlock_cloud.locks:
+            coordinator.poll_scheduler.boost(lock_id)
+        await coordinator.async_refresh()
+        await hass.async_block_till_done()
+        assert coordinator.last_update_success
+
+    for _ in range(2):
+        await refresh()
+    assert coordinator.changed_fields == {}
+    assert coordinator.entity_writes_performed == 0
+    # Lock and battery sensor of both locks
+    assert coordinator.entity_writes_skipped == 8
+
+    ttlock_cloud.locks[1]["electricQuantity"] = 50
+    await refresh()
+    assert coordinator.changed_fields == {1: {"electricQuantity"}}
+    assert coordinator.entity_writes_performed == 1
+    assert coordinator.entity_writes_skipped == 11
+    battery = [
+        state
+        for state in hass.states.async_all("sensor")
+        if state.attributes.get("device_class") == "battery"
+    ]
+    assert sorted(state.state for state in battery) == ["50", "90"]
+
+    assert await hass.config_entries.async_unload(ttlock_entry.entry_id)
+    await hass.async_block_till_done()
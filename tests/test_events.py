@@ -0,0 +1,119 @@
+"""Tests for integration_ttlock record events."""
+import time
+from unittest.mock import MagicMock
+
+import pytest
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.integration_ttlock import TTLockDataUpdateCoordinator
+from custom_components.integration_ttlock.const import (
+    CONF_REFRESH_TYPE,
+    DOMAIN,
+    EVENT_RECORD,
+    REFRESH_POLLING_ACCOUNT_LOGS,
+    REFRESH_POLLING_LOGS,
+)
+from custom_components.integration_ttlock.events import TTLockRecordEvents
+from custom_components.integration_ttlock.logbook import async_describe_events
+
+from .fake_ttlock import FIRST_LOCK_DATE
+
+
+def _record(record_id: int, lock_id: int = 1) -> dict:
+    return {
+        "recordId": record_id,
+        "lockId": lock_id,
+        "recordType": 1,
+        "success": 1,
+        "username": "user",
+        "lockDate": FIRST_LOCK_DATE + record_id,
+    }
+
+
+async def test_records_fired_once(hass):
+    """Test records fire once while remembered, with bounded memory per lock."""
+    events = []
+    hass.bus.async_listen(EVENT_RECORD, events.append)
+    record_events = TTLockRecordEvents(hass, MagicMock(data=None), max_seen=2)
+
+    assert record_events.async_add([_record(2), _record(1)]) == 2
+    # Overlapping poll window and a retried callback
+    assert record_events.async_add([_record(2), _record(3)]) == 1
+    assert record_events.async_add([_record(3)]) == 0
+    # Only the two most recently seen records of a lock are remembered
+    assert record_events.async_add([_record(1)]) == 1
+    assert record_events.async_add([_record(1, lock_id=2)], fire=False) == 0
+
+    record_events.async_forget([2])
+    assert record_events.async_add([_record(3), _record(1, lock_id=2)]) == 1
+
+    await hass.async_block_till_done()
+    assert [event.data["record_id"] for event in events] == [1, 2, 3, 1, 3]
+    assert events[0].data["message"] == "unlock by app"
+    assert events[0].data["lock_name"] == "1"
+
+
+@pytest.mark.parametrize("expected_lingering_timers", [True])
+@pytest.mark.parametrize(
+    "refresh_type", [REFRESH_POLLING_LOGS, REFRESH_POLLING_ACCOUNT_LOGS]
+)
+async def test_polled_records_fired(
+    hass, tmp_path, ttlock_cloud, ttlock_client, refresh_type
+):
+    """Test records after the backfill are fired as events, also failed ones."""
+    ttlock_cloud.add_locks(1, records_per_lock=3)
+    hass.config.config_dir = str(tmp_path)
+    entry = MockConfigEntry(domain=DOMAIN, options={CONF_REFRESH_TYPE: refresh_type})
+    coordinator = TTLockDataUpdateCoordinator(hass, client=ttlock_client, entry=entry)
+    await coordinator.history.async_setup()
+
+    events = []
+    hass.bus.async_listen(EVENT_RECORD, events.append)
+    await coordinator.async_refresh()
+
+    now = int(time.time() * 1000)
+    record = ttlock_cloud.add_record(1, 11, now - 2000)
+    failed = ttlock_cloud.add_record(1, 1, now - 1000, success=0)
+    coordinator.poll_scheduler.boost(1)
+    await coordinator.async_refresh()
+    history = await coordinator.history.async_last_records(1, limit=2)
+    await coordinator.history.async_close()
+
+    await hass.async_block_till_done()
+    assert [event.data["record_id"] for event in events] == [
+        record["recordId"],
+        failed["recordId"],
+    ]
+    assert events[0].data["lock_name"] == "Lock 1"
+    assert events[0].data["message"] == "lock by app"
+    assert not events[1].data["success"]
+    assert [rec["recordId"] for rec in history] == [
+        failed["recordId"],
+        record["recordId"],
+    ]
+    # Failed unlock attempt leaves the lock locked
+    assert coordinator.data["states"][1]["state"] == 0
+
+
+async def test_logbook_describe_record(hass):
+    """Test record events are described in the logbook."""
+    describers = {}
+    async_describe_events(
+        hass, lambda domain, event, describe: describers.setdefault(event, describe)
+    )
+
+    event = MagicMock(
+        data={
+            "entity_id": "lock.front_door",
+            "lock_name": "Front door",
+            "record_type": 1,
+            "message": "unlock by app",
+            "success": False,
+            "username": "alice",
+        }
+    )
+    assert describers[EVENT_RECORD](event) == {
+        "name": "Front door",
+        "message": "unlock by app (alice), failed",
+        "entity_id": "lock.front_door",
+    }
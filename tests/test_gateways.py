@@ -0,0 +1,121 @@
+"""Tests for integration_ttlock gateway aware polling."""
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.integration_ttlock import TTLockDataUpdateCoordinator
+from custom_components.integration_ttlock.const import (
+    CONF_MAX_CONCURRENCY,
+    DOMAIN,
+    GATEWAYS_REFRESH_INTERVAL,
+)
+from custom_components.integration_ttlock.ttlock_api import TTLockError
+
+pytestmark = pytest.mark.parametrize("expected_lingering_timers", [True])
+
+
+async def test_polling_paced_per_gateway(hass, tmp_path, ttlock_cloud, ttlock_client):
+    """Test gateways are queried one lock at a time and locks without one skipped."""
+    first = ttlock_cloud.add_gateway(ttlock_cloud.add_locks(4))
+    second = ttlock_cloud.add_gateway(ttlock_cloud.add_locks(4))
+    offline = ttlock_cloud.add_locks(2, records_per_lock=3, has_gateway=False)
+    ttlock_cloud.gateway_latency = 0.02
+
+    hass.config.config_dir = str(tmp_path)
+    entry = MockConfigEntry(domain=DOMAIN, options={CONF_MAX_CONCURRENCY: 10})
+    coordinator = TTLockDataUpdateCoordinator(hass, client=ttlock_client, entry=entry)
+    await coordinator.history.async_setup()
+    await coordinator.async_refresh()
+    await coordinator.history.async_close()
+
+    assert coordinator.last_update_success
+    assert ttlock_cloud.gateway_busy == 0
+    assert ttlock_cloud.requests["/v3/lock/queryOpenState"] == 8
+    assert len(coordinator.data["states"]) == 10
+    # Newest record of the alternating unlock and lock records is an unlock
+    assert coordinator.data["states"][offline[0]]["state"] == 1
+
+    assert coordinator.gateway_for(1) == ("gateway", first)
+    assert coordinator.gateway_for(5) == ("gateway", second)
+    assert coordinator.gateway_for(offline[0]) == ("lock", offline[0])
+
+
+async def test_gateway_updates(hass, tmp_path, ttlock_cloud, ttlock_client):
+    """Test gateway locks are listed with limited concurrency and errors handled."""
+    for _ in range(6):
+        ttlock_cloud.add_gateway(ttlock_cloud.add_locks(1))
+
+    hass.config.config_dir = str(tmp_path)
+    entry = MockConfigEntry(domain=DOMAIN, options={CONF_MAX_CONCURRENCY: 2})
+    coordinator = TTLockDataUpdateCoordinator(hass, client=ttlock_client, entry=entry)
+    list_gateway_locks = ttlock_client.list_gateway_locks
+    running = []
+    most_running = 0
+
+    async def tracked_list_gateway_locks(gateway_id):
+        nonlocal most_running
+        running.append(gateway_id)
+        most_running = max(most_running, len(running))
+        await asyncio.sleep(0.01)
+        try:
+            return await list_gateway_locks(gateway_id)
+        finally:
+            running.remove(gateway_id)
+
+    locks = ttlock_cloud.locks
+    with patch.object(ttlock_client, "list_gateway_locks", tracked_list_gateway_locks):
+        await coordinator._async_update_gateways(locks)
+    assert most_running == 2
+    assert coordinator.gateway_for(6) == ("gateway", 6)
+
+    # API failures keep the known gateways
+    coordinator._gateways_updated_at -= GATEWAYS_REFRESH_INTERVAL
+    with patch.object(
+        ttlock_client, "list_gateway_locks", AsyncMock(side_effect=TTLockError(-1))
+    ):
+        await coordinator._async_update_gateways(locks)
+    assert coordinator.gateway_for(6) == ("gateway", 6)
+
+    # Programming errors are not hidden
+    with patch.object(
+        ttlock_client, "list_gateway_locks", AsyncMock(return_value=[{}])
+    ), pytest.raises(KeyError):
+        await coordinator._async_update_gateways(locks)
+
+
+async def test_gateways_refreshed_rarely(hass, tmp_path, ttlock_cloud, ttlock_client):
+    """Test gateways are listed again only when locks change or hourly."""
+    ttlock_cloud.add_gateway(ttlock_cloud.add_locks(2))
+    ttlock_cloud.add_gateway(ttlock_cloud.add_locks(2))
+
+    hass.config.config_dir = str(tmp_path)
+    coordinator = TTLockDataUpdateCoordinator(
+        hass, client=ttlock_client, entry=MockConfigEntry(domain=DOMAIN)
+    )
+    await coordinator.history.async_setup()
+
+    async def refresh_lock_list() -> tuple:
+        coordinator._locks_updated_at = None
+        await coordinator.async_refresh()
+        assert coordinator.last_update_success
+        return (
+            ttlock_cloud.requests["/v3/gateway/list"],
+            ttlock_cloud.requests["/v3/gateway/listLock"],
+        )
+
+    assert await refresh_lock_list() == (1, 2)
+    assert await refresh_lock_list() == (1, 2)
+    assert ttlock_cloud.requests["/v3/lock/list"] == 2
+
+    ttlock_cloud.locks[4]["hasGateway"] = 0
+    assert await refresh_lock_list() == (2, 4)
+    assert await refresh_lock_list() == (2, 4)
+
+    ttlock_cloud.add_locks(1)
+    assert await refresh_lock_list() == (3, 6)
+
+    coordinator._gateways_updated_at -= GATEWAYS_REFRESH_INTERVAL
+    assert await refresh_lock_list() == (4, 8)
+    await coordinator.history.async_close()
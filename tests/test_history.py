@@ -0,0 +1,110 @@
+"""Tests for integration_ttlock local record history."""
+import time
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from homeassistant.config_entries import ConfigEntryState
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.integration_ttlock.const import DOMAIN
+from custom_components.integration_ttlock.history import TTLockHistory
+
+from .test_setup_benchmark import API_CLIENT, MOCK_DATA
+
+DAY = 86400000
+
+
+def _record(record_id, lock_id: int = 1, lock_date: int = None) -> dict:
+    rec = {
+        "lockId": lock_id,
+        "recordType": 1,
+        "success": 1,
+        "username": "user",
+        "lockDate": lock_date or record_id,
+    }
+    if record_id is not None:
+        rec["recordId"] = record_id
+    return rec
+
+
+@pytest.fixture(name="history")
+async def history_fixture(hass, tmp_path):
+    """Return opened history keeping records of the last day."""
+    history = TTLockHistory(hass, str(tmp_path / "history.db"), 1)
+    await history.async_setup()
+    yield history
+    await history.async_close()
+
+
+async def test_records_stored_once(history):
+    """Test records are deduplicated on recordId, or lock date and type without."""
+    await history.async_add_records([_record(1), _record(2), _record(None, 1, 5)])
+    await history.async_add_records([_record(2), _record(3), _record(None, 1, 5)])
+
+    records = await history.async_last_records(1)
+    assert [rec["lockDate"] for rec in records] == [5, 3, 2, 1]
+
+
+async def test_query_records(history):
+    """Test newest records and records in a time range of one lock."""
+    await history.async_add_records(
+        [_record(record_id) for record_id in range(1, 21)] + [_record(21, lock_id=2)]
+    )
+
+    records = await history.async_last_records(1, limit=3)
+    assert [rec["recordId"] for rec in records] == [20, 19, 18]
+    assert (await history.async_last_records(2))[0]["recordId"] == 21
+
+    records = await history.async_records_between(1, 5, 8)
+    assert [rec["recordId"] for rec in records] == [8, 7, 6, 5]
+    assert await history.async_records_between(2, 5, 8) == []
+
+
+async def test_prune_old_records(history):
+    """Test records older than retention are removed."""
+    now = int(time.time() * 1000)
+    await history.async_add_records(
+        [_record(1, lock_date=now - 2 * DAY), _record(2, lock_date=now - 1000)]
+    )
+
+    assert await history.async_prune() == 1
+    assert await history.async_prune() == 0
+    records = await history.async_last_records(1)
+    assert [rec["recordId"] for rec in records] == [2]
+
+
+async def test_prune_uses_date_index(history):
+    """Test pruning old records does not scan the whole table."""
+    plan = history._connection.execute(
+        "EXPLAIN QUERY PLAN DELETE FROM records WHERE lock_date < ?", (0,)
+    ).fetchall()
+    assert "records_date" in plan[0][-1]
+
+
+async def test_closed_history(hass, tmp_path):
+    """Test jobs finishing after the history was closed do nothing."""
+    history = TTLockHistory(hass, str(tmp_path / "history.db"), 1)
+    await history.async_setup()
+    await history.async_close()
+
+    await history.async_add_records([_record(1)])
+    assert await history.async_last_records(1) == []
+    assert await history.async_prune() == 0
+
+
+async def test_history_closed_on_failed_setup(hass, tmp_path):
+    """Test history and its prune timer are released when setup is retried."""
+    hass.config.config_dir = str(tmp_path)
+    entry = MockConfigEntry(domain=DOMAIN, data=MOCK_DATA)
+    entry.add_to_hass(hass)
+
+    with patch(
+        f"{API_CLIENT}.async_ensure_access_token", AsyncMock(return_value=False)
+    ), patch.object(TTLockHistory, "async_close", autospec=True) as async_close:
+        await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+
+    assert entry.state is ConfigEntryState.SETUP_RETRY
+    async_close.assert_called_once()
+    # Close the connection the patched close left open
+    await TTLockHistory.async_close(async_close.call_args.args[0])
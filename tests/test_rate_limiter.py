@@ -0,0 +1,64 @@
+"""Tests for integration_ttlock rate limiter."""
+import asyncio
+
+from custom_components.integration_ttlock.rate_limiter import (
+    PRIORITY_COMMAND,
+    PRIORITY_POLL,
+    TTLockRateLimiter,
+)
+
+
+async def _start(limiter: TTLockRateLimiter, priority: int, served: list, name):
+    """Start waiting for limiter, append name to served once let through."""
+
+    async def acquire():
+        await limiter.acquire(priority)
+        served.append(name)
+
+    task = asyncio.create_task(acquire())
+    await asyncio.sleep(0)
+    return task
+
+
+async def test_burst_not_delayed():
+    """Test requests within burst are sent at once."""
+    limiter = TTLockRateLimiter(1, 3)
+
+    await asyncio.wait_for(
+        asyncio.gather(*(limiter.acquire() for _ in range(3))), timeout=0.5
+    )
+    assert limiter.max_queue_depth == {PRIORITY_COMMAND: 0, PRIORITY_POLL: 0}
+
+
+async def test_commands_served_before_polls():
+    """Test waiting commands are let through before polls queued earlier."""
+    limiter = TTLockRateLimiter(50, 1)
+    await limiter.acquire()
+    served = []
+
+    tasks = [
+        await _start(limiter, PRIORITY_POLL, served, "poll 1"),
+        await _start(limiter, PRIORITY_POLL, served, "poll 2"),
+        await _start(limiter, PRIORITY_COMMAND, served, "command"),
+    ]
+    assert limiter.queue_depth == {PRIORITY_COMMAND: 1, PRIORITY_POLL: 2}
+
+    await asyncio.wait_for(asyncio.gather(*tasks), timeout=1)
+    assert served == ["command", "poll 1", "poll 2"]
+    assert limiter.queue_depth == {PRIORITY_COMMAND: 0, PRIORITY_POLL: 0}
+    assert limiter.max_queue_depth == {PRIORITY_COMMAND: 1, PRIORITY_POLL: 2}
+
+
+async def test_cancelled_waiter_skipped():
+    """Test a cancelled waiter does not take the token of the next one."""
+    limiter = TTLockRateLimiter(50, 1)
+    await limiter.acquire()
+    served = []
+
+    cancelled = await _start(limiter, PRIORITY_POLL, served, "cancelled")
+    waiting = await _start(limiter, PRIORITY_POLL, served, "waiting")
+    cancelled.cancel()
+
+    await asyncio.wait_for(waiting, timeout=1)
+    assert served == ["waiting"]
+    assert limiter.queue_depth == {PRIORITY_COMMAND: 0, PRIORITY_POLL: 0}
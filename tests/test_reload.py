@@ -0,0 +1,63 @@
+"""Tests for integration_ttlock authentication on setup and reload."""
+import pytest
+
+from custom_components.integration_ttlock.const import (
+    CONF_ACCESS_TOKEN,
+    CONF_MIN_SCAN_INTERVAL,
+    DOMAIN,
+)
+
+pytestmark = pytest.mark.parametrize("expected_lingering_timers", [True])
+
+
+async def _setup(hass, ttlock_entry):
+    """Set up entry, return its coordinator."""
+    assert await hass.config_entries.async_setup(ttlock_entry.entry_id)
+    await hass.async_block_till_done()
+    return hass.data[DOMAIN][ttlock_entry.entry_id]
+
+
+async def test_stored_token_reused(hass, ttlock_cloud, ttlock_entry):
+    """Test setup with a valid stored token does not authenticate again."""
+    ttlock_cloud.add_locks(1)
+    await _setup(hass, ttlock_entry)
+
+    assert ttlock_cloud.requests["/v3/lock/list"] == 1
+    assert ttlock_cloud.requests["/oauth2/token"] == 0
+    assert await hass.config_entries.async_unload(ttlock_entry.entry_id)
+
+
+async def test_options_reload_keeps_token(hass, ttlock_cloud, ttlock_entry):
+    """Test reload after an options change reuses the stored token."""
+    ttlock_cloud.add_locks(1)
+    coordinator = await _setup(hass, ttlock_entry)
+
+    hass.config_entries.async_update_entry(
+        ttlock_entry, options={CONF_MIN_SCAN_INTERVAL: 20}
+    )
+    await hass.async_block_till_done()
+
+    reloaded = hass.data[DOMAIN][ttlock_entry.entry_id]
+    assert reloaded is not coordinator
+    assert reloaded.poll_scheduler.min_interval == 20
+    assert ttlock_cloud.requests["/v3/lock/list"] == 2
+    assert ttlock_cloud.requests["/oauth2/token"] == 0
+    assert await hass.config_entries.async_unload(ttlock_entry.entry_id)
+
+
+async def test_new_token_not_reloaded(hass, ttlock_cloud, ttlock_entry):
+    """Test storing a refreshed token does not reload the entry."""
+    ttlock_cloud.add_locks(1)
+    coordinator = await _setup(hass, ttlock_entry)
+    access_token = ttlock_entry.data[CONF_ACCESS_TOKEN]
+
+    ttlock_cloud.expire_tokens()
+    coordinator._locks_updated_at = None
+    await coordinator.async_refresh()
+    await hass.async_block_till_done()
+
+    assert ttlock_cloud.requests["/oauth2/token"] == 1
+    assert ttlock_entry.data[CONF_ACCESS_TOKEN] != access_token
+    assert hass.data[DOMAIN][ttlock_entry.entry_id] is coordinator
+    assert ttlock_cloud.requests["/v3/lock/list"] == 3
+    assert await hass.config_entries.async_unload(ttlock_entry.entry_id)
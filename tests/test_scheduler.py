@@ -0,0 +1,56 @@
+"""Tests for integration_ttlock poll scheduler."""
+from custom_components.integration_ttlock.scheduler import (
+    ACTIVE_PERIOD,
+    BACKOFF_FACTOR,
+    POLL_SLACK,
+    TTLockPollScheduler,
+)
+
+
+def test_idle_lock_backs_off():
+    """Test poll interval of an unchanged lock grows up to maximum interval."""
+    scheduler = TTLockPollScheduler(10, 60)
+    assert scheduler.is_due(1, now=0)
+
+    now = 0
+    intervals = []
+    for _ in range(6):
+        scheduler.record_poll(1, False, now=now)
+        interval = scheduler._next_poll[1] - now
+        intervals.append(interval)
+        now += interval
+
+    assert intervals == [15, 22.5, 33.75, 50.625, 60, 60]
+
+
+def test_activity_keeps_minimum_interval():
+    """Test lock is polled at minimum interval while active, then backs off."""
+    scheduler = TTLockPollScheduler(10, 60)
+    for _ in range(3):
+        scheduler.record_poll(1, False, now=0)
+
+    scheduler.boost(1, now=100)
+    assert scheduler.is_due(1, now=100)
+
+    scheduler.record_poll(1, False, now=100)
+    assert scheduler._next_poll[1] == 110
+    # A state change extends the active period
+    scheduler.record_poll(1, True, now=100 + ACTIVE_PERIOD - 10)
+    scheduler.record_poll(1, False, now=100 + ACTIVE_PERIOD + 10)
+    assert scheduler._next_poll[1] == 100 + ACTIVE_PERIOD + 20
+
+    now = 100 + 2 * ACTIVE_PERIOD
+    scheduler.record_poll(1, False, now=now)
+    assert scheduler._next_poll[1] == now + 10 * BACKOFF_FACTOR
+
+
+def test_due_with_tick_slack():
+    """Test lock is due on a coordinator tick slightly before its next poll."""
+    scheduler = TTLockPollScheduler(10, 60)
+    scheduler.record_poll(1, True, now=0)
+    scheduler.record_poll(2, False, now=0)
+
+    assert not scheduler.is_due(1, now=10 - POLL_SLACK - 0.1)
+    assert scheduler.is_due(1, now=10 - POLL_SLACK)
+    assert scheduler.due_locks([1, 2, 3], now=10) == [1, 3]
+    assert scheduler.due_locks([1, 2, 3], now=15) == [1, 2, 3]
@@ -0,0 +1,85 @@
+"""Tests for integration_ttlock services."""
+import time
+from unittest.mock import patch
+
+import pytest
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.integration_ttlock.const import (
+    CONF_ACCESS_TOKEN,
+    CONF_ACCESS_TOKEN_EXPIRES_AT,
+    CONF_CLIENT_ID,
+    CONF_CLIENT_SECRET,
+    CONF_RATE_BURST,
+    CONF_RATE_LIMIT,
+    CONF_REFRESH_TOKEN,
+    CONF_SERVER,
+    CONF_USERNAME,
+    DOMAIN,
+    SERVICE_BULK_LOCK,
+)
+
+# Snapshot and record marks are saved with a delay
+pytestmark = pytest.mark.parametrize("expected_lingering_timers", [True])
+
+
+@pytest.fixture(name="entry")
+async def entry_fixture(hass, ttlock_cloud):
+    """Set up an entry against the fake TTLock cloud."""
+    ttlock_cloud.add_locks(50)
+    tokens = ttlock_cloud.issue_tokens()
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={
+            CONF_SERVER: ttlock_cloud.url,
+            CONF_CLIENT_ID: "client_id",
+            CONF_CLIENT_SECRET: "client_secret",
+            CONF_USERNAME: "test_username",
+            CONF_REFRESH_TOKEN: tokens["refresh_token"],
+            CONF_ACCESS_TOKEN: tokens["access_token"],
+            CONF_ACCESS_TOKEN_EXPIRES_AT: time.time() + tokens["expires_in"],
+        },
+        options={CONF_RATE_LIMIT: 100, CONF_RATE_BURST: 100},
+    )
+    entry.add_to_hass(hass)
+    with patch("custom_components.integration_ttlock.commands.CONFIRM_DELAYS", (0,)):
+        assert await hass.config_entries.async_setup(entry.entry_id)
+        yield entry
+        assert await hass.config_entries.async_unload(entry.entry_id)
+
+
+async def test_bulk_unlock_all(hass, entry, ttlock_cloud):
+    """Test all locks are unlocked with a result per lock."""
+    response = await hass.services.async_call(
+        DOMAIN,
+        SERVICE_BULK_LOCK,
+        {"action": "unlock", "all": True, "max_concurrency": 10},
+        blocking=True,
+        return_response=True,
+    )
+
+    assert response["succeeded"] == 50
+    assert response["failed"] == 0
+    assert response["results"]["lock.lock_1"]["lock_id"] == 1
+    assert response["results"]["lock.lock_1"]["elapsed_ms"] >= 0
+    assert set(ttlock_cloud.states.values()) == {1}
+
+
+async def test_bulk_lock_entities(hass, entry, ttlock_cloud):
+    """Test only targeted locks are commanded and failures are reported."""
+    ttlock_cloud.states.update({1: 1, 2: 1, 3: 1})
+    del ttlock_cloud.states[2]
+
+    response = await hass.services.async_call(
+        DOMAIN,
+        SERVICE_BULK_LOCK,
+        {"entity_id": ["lock.lock_1", "lock.lock_2"]},
+        blocking=True,
+        return_response=True,
+    )
+
+    assert response["succeeded"] == 1
+    assert response["results"]["lock.lock_2"]["success"] is False
+    assert "error" in response["results"]["lock.lock_2"]
+    assert ttlock_cloud.states[1] == 0
+    assert ttlock_cloud.states[3] == 1
@@ -0,0 +1,100 @@
+"""Benchmark integration_ttlock setup with large lock fleets."""
+import time
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.integration_ttlock.const import (
+    CONF_ACCESS_TOKEN,
+    CONF_ACCESS_TOKEN_EXPIRES_AT,
+    CONF_CLIENT_ID,
+    CONF_CLIENT_SECRET,
+    CONF_REFRESH_TOKEN,
+    CONF_REFRESH_TYPE,
+    CONF_SERVER,
+    CONF_USERNAME,
+    DOMAIN,
+    REFRESH_POLLING,
+)
+
+API_CLIENT = "custom_components.integration_ttlock.ttlock_api.TTLockApiClient"
+GATEWAY_LOCKS = 100
+
+MOCK_DATA = {
+    CONF_SERVER: "https://euapi.ttlock.com",
+    CONF_CLIENT_ID: "client_id",
+    CONF_CLIENT_SECRET: "client_secret",
+    CONF_USERNAME: "test_username",
+    CONF_REFRESH_TOKEN: "refresh_token",
+    CONF_ACCESS_TOKEN: "access_token",
+    CONF_ACCESS_TOKEN_EXPIRES_AT: time.time() + 86400,
+}
+
+
+def _locks(count):
+    return [
+        {
+            "lockId": lock_id,
+            "lockName": f"M{lock_id}",
+            "lockAlias": f"Lock {lock_id}",
+            "lockMac": f"00:00:00:00:{lock_id // 256:02x}:{lock_id % 256:02x}",
+            "electricQuantity": 80,
+            "hasGateway": 1,
+        }
+        for lock_id in range(1, count + 1)
+    ]
+
+
+def _gateways(locks: list) -> dict:
+    """Return locks of gateways relaying to up to 100 locks each."""
+    return {
+        index // GATEWAY_LOCKS + 1: locks[index : index + GATEWAY_LOCKS]
+        for index in range(0, len(locks), GATEWAY_LOCKS)
+    }
+
+
+@pytest.mark.parametrize(
+    "count", [10, 100, 1000, pytest.param(5000, marks=pytest.mark.timeout(60))]
+)
+def test_setup_time(hass, event_loop, benchmark, caplog, count):
+    """Measure time from setup start until all entities exist."""
+    locks = _locks(count)
+    gateways = _gateways(locks)
+    pages = {
+        "/v3/lock/list": locks,
+        "/v3/gateway/list": [{"gatewayId": gateway_id} for gateway_id in gateways],
+    }
+
+    async def iter_pages(self, url, params, page_size):
+        for item in pages[url]:
+            yield item
+
+    async def list_gateway_locks(self, gateway_id):
+        return gateways[gateway_id]
+
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data=MOCK_DATA,
+        options={CONF_REFRESH_TYPE: REFRESH_POLLING},
+        entry_id="benchmark",
+    )
+    entry.add_to_hass(hass)
+
+    async def async_setup():
+        assert await hass.config_entries.async_setup(entry.entry_id)
+
+    with patch(f"{API_CLIENT}._iter_pages", iter_pages), patch(
+        f"{API_CLIENT}.list_gateway_locks", list_gateway_locks
+    ), patch(f"{API_CLIENT}.query_open_state", AsyncMock(return_value={"state": 0})):
+        benchmark.pedantic(lambda: event_loop.run_until_complete(async_setup()))
+
+        # Platforms are awaited by setup, no entity is added afterwards
+        assert len(hass.states.async_entity_ids("lock")) == count
+        assert len(hass.states.async_entity_ids("sensor")) == count
+        assert "Failed to update gateways" not in caplog.text
+
+        assert event_loop.run_until_complete(
+            hass.config_entries.async_unload(entry.entry_id)
+        )
+        event_loop.run_until_complete(hass.async_block_till_done())
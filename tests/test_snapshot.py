@@ -0,0 +1,70 @@
+"""Tests for integration_ttlock startup from a snapshot."""
+import time
+
+import pytest
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.integration_ttlock.const import (
+    CONF_ACCESS_TOKEN,
+    CONF_ACCESS_TOKEN_EXPIRES_AT,
+    CONF_CLIENT_ID,
+    CONF_CLIENT_SECRET,
+    CONF_REFRESH_TOKEN,
+    CONF_SERVER,
+    CONF_USERNAME,
+    DOMAIN,
+)
+
+SNAPSHOT_KEY = f"{DOMAIN}.snapshot_entry.snapshot"
+
+
+@pytest.mark.parametrize("expected_lingering_timers", [True])
+async def test_locks_changed_while_down(hass, hass_storage, tmp_path, ttlock_cloud):
+    """Test entities follow locks added and removed while Home Assistant was down."""
+    ttlock_cloud.add_locks(3)
+    removed_lock = ttlock_cloud.locks.pop(1)
+    hass_storage[SNAPSHOT_KEY] = {
+        "version": 1,
+        "key": SNAPSHOT_KEY,
+        "data": {
+            "locks": {"1": removed_lock},
+            "states": {"1": {"state": 0, "state_changed_by": None}},
+        },
+    }
+
+    tokens = ttlock_cloud.issue_tokens()
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        entry_id="snapshot_entry",
+        data={
+            CONF_SERVER: ttlock_cloud.url,
+            CONF_CLIENT_ID: "client_id",
+            CONF_CLIENT_SECRET: "client_secret",
+            CONF_USERNAME: "test_username",
+            CONF_ACCESS_TOKEN: tokens["access_token"],
+            CONF_ACCESS_TOKEN_EXPIRES_AT: time.time() + tokens["expires_in"],
+            CONF_REFRESH_TOKEN: tokens["refresh_token"],
+        },
+    )
+    entry.add_to_hass(hass)
+    hass.config.config_dir = str(tmp_path)
+
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    assert hass.states.async_entity_ids("lock") == ["lock.lock_1"]
+
+    # Revalidation reloads the entry once the lock list is known
+    for _ in range(100):
+        await hass.async_block_till_done()
+        coordinator = hass.data[DOMAIN].get(entry.entry_id)
+        if coordinator is not None and coordinator.data["locks"].keys() == {2, 3}:
+            break
+    await hass.async_block_till_done()
+
+    assert sorted(hass.states.async_entity_ids("lock")) == [
+        "lock.lock_2",
+        "lock.lock_3",
+    ]
+    assert hass_storage[SNAPSHOT_KEY]["data"]["locks"].keys() == {"2", "3"}
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
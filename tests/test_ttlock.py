@@ -0,0 +1,79 @@
+"""Test integration_ttlock record helpers."""
+from custom_components.integration_ttlock.ttlock import (
+    EFFECT_LOCK,
+    EFFECT_NONE,
+    EFFECT_UNLOCK,
+    classify_records,
+    extract_lock_status_from_pages,
+    extract_lock_status_from_records,
+    extract_lock_status_from_records_with_lock_id,
+    group_records_by_lock_id,
+    lock_record_types,
+    record_type_info,
+    record_type_to_message,
+    unlock_record_types,
+)
+
+
+def _record(record_id, lock_date, record_type, lock_id=1, success=1):
+    return {
+        "lockId": lock_id,
+        "recordId": record_id,
+        "lockDate": lock_date,
+        "recordType": record_type,
+        "success": success,
+        "username": f"user{record_id}",
+    }
+
+
+def test_record_type_registry():
+    """Test record type lookups."""
+    assert record_type_to_message(1) == "unlock by app"
+    assert record_type_to_message(45) == "Auto Lock"
+    assert record_type_to_message(999) == ""
+    assert record_type_info(31).category == "door_sensor"
+    assert 1 in unlock_record_types and 11 in lock_record_types
+    assert unlock_record_types.isdisjoint(lock_record_types)
+
+
+def test_classify_records():
+    """Test classification of a page of records."""
+    records = [_record(1, 1, 1), _record(2, 2, 11), _record(3, 3, 30)]
+    assert list(classify_records(records)) == [EFFECT_UNLOCK, EFFECT_LOCK, EFFECT_NONE]
+
+
+def test_extract_lock_status():
+    """Test extraction of the newest state changing record."""
+    records = [_record(1, 10, 1), _record(2, 30, 30), _record(3, 20, 11)]
+    assert extract_lock_status_from_records(records) == (0, "user3")
+    assert extract_lock_status_from_records([_record(1, 1, 30)]) == (2, "")
+
+    records.append(_record(4, 40, 1, lock_id=2))
+    records.append(_record(5, 50, 1, success=0))
+    assert extract_lock_status_from_records_with_lock_id(1, records) == (0, "user3")
+
+
+def test_extract_lock_status_from_pages():
+    """Test early exit extraction over newest first pages."""
+
+    def pages():
+        yield [_record(5, 50, 30), _record(4, 40, 1)]
+        raise AssertionError("Older page must not be consumed")
+
+    assert extract_lock_status_from_pages(pages()) == (1, "user4")
+    assert extract_lock_status_from_pages([[], [_record(1, 1, 30)]]) == (2, "")
+
+    records = [_record(3, 30, 11), _record(2, 20, 1), _record(1, 10, 45)]
+    assert extract_lock_status_from_pages([records]) == (
+        extract_lock_status_from_records(reversed(records))
+    )
+
+
+def test_failed_records_grouped_not_applied():
+    """Test failed attempts are kept per lock but never change the state."""
+    records = [_record(3, 30, 1, success=0), _record(2, 20, 11), _record(1, 10, 1)]
+    grouped = group_records_by_lock_id(records + [_record(4, 40, 1, lock_id=2)])
+    assert [rec["recordId"] for rec in grouped[1]] == [3, 2, 1]
+
+    assert extract_lock_status_from_pages([grouped[1]]) == (0, "user2")
+    assert extract_lock_status_from_records(grouped[1]) == (0, "user2")
@@ -0,0 +1,138 @@
+"""Tests for integration_ttlock webhook callbacks."""
+import asyncio
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+from urllib.parse import urlencode
+
+import pytest
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.integration_ttlock import (
+    TTLockDataUpdateCoordinator,
+    handle_webhook,
+)
+from custom_components.integration_ttlock.const import (
+    CONF_REFRESH_TYPE,
+    DOMAIN,
+    EVENT_RECORD,
+    REFRESH_WEBHOOK_LOGS,
+)
+from custom_components.integration_ttlock.webhook import TTLockWebhookQueue
+
+from .fake_ttlock import FIRST_LOCK_DATE
+
+
+def _body(lock_id: int, *records) -> str:
+    """Return callback body with records of type and lock date offset."""
+    return urlencode(
+        {
+            "lockId": lock_id,
+            "records": json.dumps(
+                [
+                    {
+                        "recordType": record_type,
+                        "success": 1,
+                        "username": "user",
+                        "lockDate": FIRST_LOCK_DATE + offset,
+                    }
+                    for record_type, offset in records
+                ]
+            ),
+        }
+    )
+
+
+async def test_invalid_callback_skipped(hass):
+    """Test an invalid callback does not drop the others of its batch."""
+    coordinator = MagicMock()
+    queue = TTLockWebhookQueue(hass, coordinator)
+
+    queue._process_batch(
+        [
+            _body(1, (1, 0), (11, 1)),
+            "lockId=6&notifyType=2",
+            "lockId=7&records=not json",
+            _body(2, (12, 0)),
+        ]
+    )
+
+    records = coordinator.async_push_records.call_args.args[0]
+    assert [(rec["lockId"], rec["recordType"]) for rec in records] == [
+        (1, 1),
+        (1, 11),
+        (2, 12),
+    ]
+
+
+async def test_retried_callbacks_deduplicated(hass):
+    """Test records repeated by retried callbacks are applied once."""
+    coordinator = MagicMock()
+    queue = TTLockWebhookQueue(hass, coordinator)
+
+    queue._process_batch([_body(1, (1, 0)), _body(1, (1, 0), (11, 1))])
+
+    records = coordinator.async_push_records.call_args.args[0]
+    assert [rec["lockDate"] - FIRST_LOCK_DATE for rec in records] == [0, 1]
+
+
+async def test_callbacks_batched(hass):
+    """Test callbacks of a burst are applied in one batch."""
+    coordinator = MagicMock()
+    with patch(
+        "custom_components.integration_ttlock.webhook.WEBHOOK_BATCH_DELAY", 0.01
+    ):
+        queue = TTLockWebhookQueue(hass, coordinator)
+        queue.start()
+        for offset in range(3):
+            assert queue.enqueue(_body(offset + 1, (1, offset)))
+        await asyncio.sleep(0.05)
+        queue.stop()
+
+    coordinator.async_push_records.assert_called_once()
+    records = coordinator.async_push_records.call_args.args[0]
+    assert [rec["lockId"] for rec in records] == [1, 2, 3]
+
+
+async def test_full_queue_not_acknowledged(hass):
+    """Test callbacks are rejected when the queue is full so TTLock retries."""
+    with patch("custom_components.integration_ttlock.webhook.WEBHOOK_QUEUE_SIZE", 1):
+        queue = TTLockWebhookQueue(hass, MagicMock())
+    entry = MagicMock(entry_id="entry")
+    hass.data[DOMAIN] = {"entry": MagicMock(webhook_queue=queue)}
+    request = MagicMock(text=AsyncMock(return_value=_body(1, (1, 0))))
+
+    response = await handle_webhook(entry, hass, "webhook_id", request)
+    assert response.status == 200
+    response = await handle_webhook(entry, hass, "webhook_id", request)
+    assert response.status == 503
+
+
+@pytest.mark.parametrize("expected_lingering_timers", [True])
+async def test_delayed_callback_not_applied(hass, tmp_path, ttlock_client):
+    """Test a callback older than applied records does not revert the state."""
+    hass.config.config_dir = str(tmp_path)
+    entry = MockConfigEntry(
+        domain=DOMAIN, options={CONF_REFRESH_TYPE: REFRESH_WEBHOOK_LOGS}
+    )
+    coordinator = TTLockDataUpdateCoordinator(hass, client=ttlock_client, entry=entry)
+    coordinator.data = {"locks": {}, "states": coordinator.state_store.states}
+    queue = TTLockWebhookQueue(hass, coordinator)
+    events = []
+    hass.bus.async_listen(EVENT_RECORD, events.append)
+
+    queue._process_batch([_body(1, (12, 0), (11, 10))])
+    assert coordinator.state_store.states[1]["state"] == 0
+
+    # Retried first callback and an older one arrive in a later batch
+    queue._process_batch([_body(1, (12, 0)), _body(1, (12, 5))])
+    assert coordinator.state_store.states[1]["state"] == 0
+
+    queue._process_batch([_body(1, (12, 20))])
+    assert coordinator.state_store.states[1]["state"] == 1
+
+    await hass.async_block_till_done()
+    assert [event.data["lock_date"] - FIRST_LOCK_DATE for event in events] == [
+        0,
+        10,
+        20,
+    ]